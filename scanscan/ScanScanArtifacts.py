@@ -0,0 +1,130 @@
+#!/usr/bin/env python3
+# -*- mode: python -*-
+# -*- coding: utf-8 -*-
+
+##
+# Licensed to the Apache Software Foundation (ASF) under one
+# or more contributor license agreements.  See the NOTICE file
+# distributed with this work for additional information
+# regarding copyright ownership.  The ASF licenses this file
+# to you under the Apache License, Version 2.0 (the
+# "License"); you may not use this file except in compliance
+# with the License.  You may obtain a copy of the License at
+#
+# https://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+
+"""Find the latest and out of date versions of artifacts in a directory."""
+
+from scanscan import ScanScan
+from scanscan.ScanScanTagIndex import ScanScanTagIndex
+
+import functools
+import re
+
+
+class ScanScanArtifacts(ScanScan):
+
+    """Find the latest and out of date versions of artifacts in a directory.
+
+    Artifacts are files like jars and tarballs with a version in their name,
+    grouped by their tag (see ScanScan.get_tag).  The directory is indexed
+    with a ScanScanTagIndex, and the versions of each tag are only parsed and
+    sorted again when the index changes.
+    """
+
+    # The numeric part of a version, and the rest.
+    fetch_version_numbers = re.compile(r"^(\d+(?:[.-]\d+)*)(.*)$", re.DOTALL)
+
+    # The file extensions after the version qualifier.
+    fetch_extensions = re.compile(r"(\.[A-Za-z][A-Za-z0-9]*)+$")
+
+    def __init__(self, dir, file_lambda=None):
+        """Find the artifacts in a directory.
+
+        Keyword arguments:
+        dir -- the directory to recursively search.
+        file_lambda -- optional, a function to apply on the path and filename
+            returning true if the file is an artifact.
+        """
+        super(ScanScanArtifacts, self).__init__()
+        self.index = ScanScanTagIndex(dir, file_lambda)
+        # The tag to a list of (key, path, version) sorted from oldest to newest.
+        self.__versions = None
+
+    @staticmethod
+    @functools.lru_cache(maxsize=65536)
+    def parse_version(version):
+        """Return a key to sort the version (see ScanScan.get_version).
+
+        The key is a tuple of the version numbers, whether it is a release
+        (without a qualifier like -SNAPSHOT or -tests), and the qualifier.  The
+        file extension is ignored.
+
+        1.10.2.jar => ((1, 10, 2), True, "")
+        1.11.0-SNAPSHOT.tar.gz => ((1, 11, 0), False, "-SNAPSHOT")
+        """
+        match = ScanScanArtifacts.fetch_version_numbers.match(version)
+        if match is None:
+            return (), False, version
+        numbers = tuple(int(n) for n in re.split(r"[.-]", match.group(1)))
+        qualifier = ScanScanArtifacts.fetch_extensions.sub("", match.group(2))
+        return numbers, qualifier == "", qualifier
+
+    def versions(self):
+        """Return the tag to a list of (path, version) from oldest to newest.
+
+        Files without a version aren't artifacts and are not included.
+        """
+        return {
+            tag: [(path, version) for _, path, version in found]
+            for tag, found in self.__sorted().items()
+        }
+
+    def latest(self):
+        """Return the tag to the (path, version) of its newest artifact."""
+        return {tag: found[-1][1:] for tag, found in self.__sorted().items()}
+
+    def duplicates(self):
+        """Return the tag to its artifacts, for tags with different versions.
+
+        Only the version numbers are compared, so a -tests or -sources artifact
+        of the same version is not a duplicate.
+        """
+        return {
+            tag: [(path, version) for _, path, version in found]
+            for tag, found in self.__sorted().items()
+            if found[0][0][0] != found[-1][0][0]
+        }
+
+    def older_than(self, n):
+        """Return the paths of all the artifacts older than the n newest versions.
+
+        Each tag keeps the artifacts of its n newest version numbers.
+        """
+        paths = []
+        for found in self.__sorted().values():
+            newest = sorted({key[0] for key, _, _ in found}, reverse=True)[:n]
+            paths.extend(path for key, path, _ in found if key[0] not in newest)
+        return sorted(paths)
+
+    def __sorted(self):
+        """Return the tag to its sorted (key, path, version) artifacts."""
+        if self.index.refresh() or self.__versions is None:
+            self.__versions = {}
+            for tag, files in self.index.tags.items():
+                found = [
+                    (ScanScanArtifacts.parse_version(version), path, version)
+                    for path, version in files
+                    if version is not None
+                ]
+                if found:
+                    found.sort()
+                    self.__versions[tag] = found
+        return self.__versions
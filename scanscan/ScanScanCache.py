@@ -0,0 +1,239 @@
+#!/usr/bin/env python3
+# -*- mode: python -*-
+# -*- coding: utf-8 -*-
+
+##
+# Licensed to the Apache Software Foundation (ASF) under one
+# or more contributor license agreements.  See the NOTICE file
+# distributed with this work for additional information
+# regarding copyright ownership.  The ASF licenses this file
+# to you under the Apache License, Version 2.0 (the
+# "License"); you may not use this file except in compliance
+# with the License.  You may obtain a copy of the License at
+#
+# https://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+
+"""Reuse the result of a content transformation for identical content."""
+
+import functools
+import hashlib
+import os
+import pickle
+import re
+import types
+
+# The type of compiled regexes, which is only re.Pattern since python 3.7.
+PATTERN_TYPE = type(re.compile(""))
+
+
+class ScanScanCache(object):
+
+    """Reuse the result of a content transformation for identical content.
+
+    The results are keyed on a hash of the content and a fingerprint of the
+    content lambda, so copies of the same file are only transformed once.
+    """
+
+    # The format of the persisted cache, changed when the contents change.
+    VERSION = 2
+
+    def __init__(self, cache_filename=None):
+        """Create an empty cache.
+
+        Keyword arguments:
+        cache_filename -- optional, the file where the cache is persisted
+            between runs.  The fingerprints of the content lambdas must be the
+            same from one run to the next for the results to be reused.
+        """
+        self.cache_filename = cache_filename
+        # The (fingerprint, digest) to the result of the content lambda.
+        self.results = {}
+        self.hits = 0
+        self.misses = 0
+        if cache_filename is not None and os.path.exists(cache_filename):
+            self.load()
+
+    def load(self):
+        """Reload the cache from its file, discarding it if it is out of date."""
+        with open(self.cache_filename, "rb") as cache_file:
+            saved = pickle.load(cache_file)
+        if saved.get("version") == ScanScanCache.VERSION:
+            self.results = saved["results"]
+
+    def save(self):
+        """Persist the cache to its file."""
+        tmp_filename = self.cache_filename + ".tmp"
+        with open(tmp_filename, "wb") as cache_file:
+            pickle.dump(
+                {"version": ScanScanCache.VERSION, "results": self.results},
+                cache_file,
+                pickle.HIGHEST_PROTOCOL,
+            )
+        os.replace(tmp_filename, self.cache_filename)
+
+    def apply(self, content_lambda, content, fingerprint=None):
+        """Return the result of the content lambda, reusing any cached result.
+
+        Keyword arguments:
+        content_lambda -- a function to apply on the text of a file, returning
+            the new text.
+        content -- the text of the file.
+        fingerprint -- optional, a string that identifies the content lambda.
+            If not present, one is computed from the function.  If the
+            function can't be described, its results aren't cached.
+        """
+        if fingerprint is None:
+            fingerprint = ScanScanCache.fingerprint(content_lambda)
+        if fingerprint is None:
+            self.misses += 1
+            return content_lambda(content)
+        key = (fingerprint, ScanScanCache.digest(content))
+        if key in self.results:
+            self.hits += 1
+            return self.results[key]
+        self.misses += 1
+        result = content_lambda(content)
+        self.results[key] = result
+        return result
+
+    @staticmethod
+    def digest(content):
+        """Return a hash of the text or bytes content."""
+        if isinstance(content, str):
+            content = content.encode("utf-8", "surrogatepass")
+        return hashlib.sha256(content).digest()
+
+    @staticmethod
+    def fingerprint(content_lambda, visited=None):
+        """Return a string that identifies what a function does.
+
+        This is built from the code of the function and the values that it
+        captures, such as the search and replace arguments of
+        ScanScan.content_replace.  Bound methods include the state of their
+        instance, and callable objects the state of the object and the code of
+        their __call__ method.
+
+        Returns None if the function uses a value that can't be described
+        without its memory address, such as an object without a __dict__.
+
+        The names of the globals that the function uses are part of the
+        fingerprint, but not their values.  If a helper function or a global
+        changes between runs, a persisted cache returns stale results unless
+        an explicit fingerprint is passed to apply.
+        """
+        if visited is None:
+            visited = set()
+        return ScanScanCache.__describe(content_lambda, visited)
+
+    @staticmethod
+    def __describe(value, visited):
+        """Return a string that describes the value, or None if it can't."""
+        if value is None or isinstance(value, (bool, int, float, complex, str, bytes)):
+            return repr(value)
+        if isinstance(value, PATTERN_TYPE):
+            # The repr of a compiled regex is truncated.
+            return "re.compile(%r, %r)" % (value.pattern, value.flags)
+        if isinstance(value, type):
+            return "%s.%s" % (value.__module__, value.__qualname__)
+        if isinstance(value, types.ModuleType):
+            return value.__name__
+        if id(value) in visited:
+            return "<recursive %s>" % type(value).__qualname__
+        visited.add(id(value))
+        try:
+            return ScanScanCache.__describe_object(value, visited)
+        finally:
+            visited.discard(id(value))
+
+    @staticmethod
+    def __describe_object(value, visited):
+        """Return a string that describes a container, function or object."""
+        describe = ScanScanCache.__describe
+        if isinstance(value, (tuple, list, set, frozenset)):
+            items = [describe(item, visited) for item in value]
+            if None in items:
+                return None
+            if isinstance(value, (set, frozenset)):
+                items.sort()
+            return "%s(%s)" % (type(value).__name__, ", ".join(items))
+        if isinstance(value, dict):
+            items = [
+                (describe(k, visited), describe(v, visited)) for k, v in value.items()
+            ]
+            if any(k is None or v is None for k, v in items):
+                return None
+            return "{%s}" % ", ".join("%s: %s" % item for item in sorted(items))
+        if isinstance(value, functools.partial):
+            parts = [describe(value.func, visited)]
+            parts.append(describe(value.args, visited))
+            parts.append(describe(value.keywords, visited))
+        elif isinstance(value, types.MethodType):
+            parts = [describe(value.__func__, visited)]
+            parts.append(describe(value.__self__, visited))
+        elif isinstance(getattr(value, "__code__", None), types.CodeType):
+            parts = [ScanScanCache.__describe_function(value, visited)]
+        elif isinstance(value, types.BuiltinFunctionType):
+            # Builtin functions, or methods of builtin objects like "a".upper
+            module = value.__module__ or type(value.__self__).__module__
+            parts = ["%s.%s" % (module, value.__qualname__)]
+            if not isinstance(value.__self__, types.ModuleType):
+                parts.append(describe(value.__self__, visited))
+        elif hasattr(value, "__objclass__"):
+            # Methods of builtin types like str.upper
+            parts = ["%s.%s" % (value.__objclass__.__module__, value.__qualname__)]
+        elif hasattr(value, "__dict__"):
+            parts = [describe(type(value), visited)]
+            parts.append(describe(vars(value), visited))
+            call = getattr(type(value), "__call__", None)
+            if isinstance(getattr(call, "__code__", None), types.CodeType):
+                parts.append(describe(call, visited))
+        else:
+            return None
+        if None in parts:
+            return None
+        return "%s(%s)" % (type(value).__name__, ", ".join(parts))
+
+    @staticmethod
+    def __describe_function(function, visited):
+        """Return a string that describes a python function, or None."""
+        describe = ScanScanCache.__describe
+        captured = []
+        for cell in function.__closure__ or ():
+            try:
+                captured.append(describe(cell.cell_contents, visited))
+            except ValueError:
+                # The cell of a variable that isn't assigned yet.
+                captured.append("<empty>")
+        defaults = describe(function.__defaults__, visited)
+        kwdefaults = describe(function.__kwdefaults__, visited)
+        if None in captured or defaults is None or kwdefaults is None:
+            return None
+        return "%s.%s:%s:%s:%s:%s" % (
+            function.__module__,
+            function.__qualname__,
+            ScanScanCache.__code_digest(function.__code__),
+            defaults,
+            kwdefaults,
+            ", ".join(captured),
+        )
+
+    @staticmethod
+    def __code_digest(code):
+        """Return a hash of the code, including any nested code objects."""
+        h = hashlib.sha256(code.co_code)
+        # The bytecode refers to names and constants by index only.
+        for names in (code.co_names, code.co_varnames, code.co_freevars):
+            h.update(repr(names).encode("utf-8", "surrogatepass"))
+        for const in code.co_consts:
+            if isinstance(const, types.CodeType):
+                h.update(ScanScanCache.__code_digest(const).encode("ascii"))
+            else:
+                h.update(repr(const).encode("utf-8", "surrogatepass"))
+        return h.hexdigest()
@@ -23,24 +23,74 @@
 """Successively apply content transformations to a file."""
 
 from scanscan import ScanScan
+from scanscan.ScanScanPieces import ScanScanPieces
 
+import locale
+import mmap
+import os
 import re
 
 
 class ScanScanFile(ScanScan):
 
-    """Successively apply content transformations to a file."""
+    """Successively apply content transformations to a file.
 
-    def __init__(self, filename):
-        """Create the instance of this object from a file."""
+    The file is only read when its content is first used, and only written
+    if it was modified.
+    """
+
+    def __init__(self, filename, encoding=None, binary=False, pieces=False):
+        """Create the instance of this object from a file.
+
+        Keyword arguments:
+        filename -- the file to read and transform.
+        encoding -- optional, the encoding of the text file.  By default, the
+            platform encoding is used.
+        binary -- optional, if true the content is kept as bytes and never
+            decoded.
+        pieces -- optional, if true the content is kept in a piece table, so
+            that insert and insert_after_line don't copy the content.
+        """
         super(ScanScanFile, self).__init__()
         self.filename = filename
-        self.load(filename)
+        self.encoding = encoding
+        self.binary = binary
+        self.pieces = pieces
+        # True if the content was modified since it was loaded or written.
+        self.dirty = False
+        self.__loaded = False
+        self.__content = None
+        self.__pieces = None
+
+    @property
+    def content(self):
+        """The content of the file, loaded and materialized when necessary."""
+        if not self.__loaded:
+            self.load(self.filename)
+        if self.__pieces is not None and self.__content is None:
+            self.__content = self.__pieces.materialize()
+            self.__pieces = ScanScanPieces(self.__content)
+        return self.__content
+
+    @content.setter
+    def content(self, content):
+        self.__set_content(content)
+        self.dirty = True
+
+    def __set_content(self, content):
+        self.__loaded = True
+        self.__content = content
+        self.__pieces = ScanScanPieces(content) if self.pieces else None
 
     def load(self, filename):
         """Reload the contents of the specified file into memory."""
-        with open(filename, "r") as content_file:
-            self.content = content_file.read()
+        if self.binary:
+            with open(filename, "rb") as content_file:
+                self.__set_content(content_file.read())
+        else:
+            with open(filename, "r", encoding=self.encoding) as content_file:
+                self.__set_content(content_file.read())
+        self.dirty = False
 
     def apply(self, content_lambda, die_on_not_applied=False):
         """Rewrite the stored content using the function.
@@ -50,17 +100,108 @@ class ScanScanFile(ScanScan):
         """
         content = content_lambda(self.content)
         if content is not None:
-            self.content = content
+            if content != self.content:
+                self.content = content
         elif die_on_not_applied:
             raise Exception("Not applied.")
         return self
 
+    def insert(self, pos, text):
+        """Insert the text at the position in the content."""
+        if self.__pieces is None:
+            self.content = self.content[:pos] + text + self.content[pos:]
+        else:
+            self.__pieces.insert(pos, text)
+            self.__content = None
+            self.dirty = True
+        return self
+
+    def insert_after_line(self, test, to_add, die_on_not_applied=False):
+        """Insert a line after the first line that contains the test regex.
+
+        With a piece table, each piece is searched separately, so the line
+        must not have been split by an earlier insert in the middle of it.
+
+        Keyword arguments:
+        test -- a regex to search for in a line, which can be bytes if the
+            file is binary.
+        to_add -- the text of the line to insert, without the line separator.
+        """
+        newline = "\n"
+        pattern = ScanScan.format_pattern(r"^[^\n]*(?:%s)[^\n]*(?:\n|\Z)", test)
+        if self.binary:
+            newline = newline.encode()
+            if isinstance(pattern, str):
+                pattern = pattern.encode(self.encoding or "utf-8")
+        pattern = re.compile(pattern, re.MULTILINE)
+        if not self.__loaded:
+            self.load(self.filename)
+        if self.__pieces is None:
+            match = pattern.search(self.content)
+            found = None if match is None else (match.start(), match.end(), match)
+        else:
+            found = self.__pieces.search(pattern)
+        if found is None:
+            if die_on_not_applied:
+                raise Exception("Not applied.")
+            return self
+        _, end, match = found
+        if match.group().endswith(newline):
+            return self.insert(end, to_add + newline)
+        return self.insert(end, newline + to_add)
+
     def contains_xml_comment(self, comment):
-        """Return true if an xml comment exists with the exact content."""
-        return re.search(r"\<!--\s*%s\s*--\>" % comment, self.content) is not None
+        """Return true if an xml comment exists with the exact content.
+
+        If the file hasn't been loaded yet and its encoding is compatible with
+        ASCII, it is searched with a read-only memory map instead.
+        """
+        pattern = ScanScan.format_pattern(r"\<!--\s*%s\s*--\>", comment)
+        if self.binary:
+            if isinstance(pattern, str):
+                pattern = pattern.encode(self.encoding or "utf-8")
+        elif not self.__loaded:
+            encoding = self.encoding or locale.getpreferredencoding(False)
+            # Only if the encoding is compatible with ASCII, like UTF-8.
+            if "<!-->".encode(encoding) == b"<!-->":
+                return self.__search_mapped(pattern.encode(encoding))
+            # Other encodings, like UTF-16, can only be searched once decoded.
+            self.load(self.filename)
+        if not self.__loaded:
+            return self.__search_mapped(pattern)
+        return re.search(pattern, self.content) is not None
+
+    def __search_mapped(self, pattern):
+        """Return true if the bytes regex is found in the file, without loading it."""
+        with open(self.filename, "rb") as content_file:
+            if os.fstat(content_file.fileno()).st_size == 0:
+                return re.search(pattern, b"") is not None
+            with mmap.mmap(
+                content_file.fileno(), 0, access=mmap.ACCESS_READ
+            ) as content_map:
+                return re.search(pattern, content_map) is not None
 
     def write(self):
         """Write any modifications to this file."""
-        with open(self.filename, "w") as content_file:
-            content_file.write(self.content)
+        if not self.dirty:
+            return self
+        self.write_file(self.filename)
+        self.dirty = False
         return self
+
+    def write_file(self, filename, fsync=False):
+        """Write the content to any file, whether or not it was modified.
+
+        Keyword arguments:
+        filename -- the file to write.
+        fsync -- optional, if true the file is flushed to disk before closing.
+        """
+        if self.binary:
+            content_file = open(filename, "wb")
+        else:
+            content_file = open(filename, "w", encoding=self.encoding)
+        with content_file:
+            content_file.write(self.content)
+            if fsync:
+                content_file.flush()
+                os.fsync(content_file.fileno())
@@ -0,0 +1,320 @@
+#!/usr/bin/env python3
+# -*- mode: python -*-
+# -*- coding: utf-8 -*-
+
+##
+# Licensed to the Apache Software Foundation (ASF) under one
+# or more contributor license agreements.  See the NOTICE file
+# distributed with this work for additional information
+# regarding copyright ownership.  The ASF licenses this file
+# to you under the Apache License, Version 2.0 (the
+# "License"); you may not use this file except in compliance
+# with the License.  You may obtain a copy of the License at
+#
+# https://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+
+"""Filters on files that are compiled into a single function."""
+
+import fnmatch
+import operator
+import os
+import re
+
+
+class Compiled(object):
+
+    """Compiles a filter the first time its function is used."""
+
+    def __get__(self, instance, owner):
+        """Return the function of the instance, compiling it if needed."""
+        if instance is None:
+            return self
+        return instance.compile()
+
+
+class ScanScanFilter(object):
+
+    """A filter on files that is compiled into a single function.
+
+    Filters can be combined with the & (and), | (or) and ~ (not) operators,
+    and the whole tree is compiled into one Python expression the first time
+    it is called, with the same arguments as the file_lambda of
+    ScanScan.apply_recursive.  Filters can be pickled and are compiled again
+    when they are first used.
+    """
+
+    # The compiled function, replaced by an attribute of the instance the
+    # first time it is used.
+    _matcher = Compiled()
+
+    # Calling a filter calls its compiled function directly, since the
+    # attrgetter is implemented in C and adds no python frame.
+    __call__ = property(operator.attrgetter("_matcher"))
+
+    def matcher(self):
+        """Return the compiled function."""
+        return self._matcher
+
+    @staticmethod
+    def unwrap(file_lambda):
+        """Return the compiled function of a filter, or any other file_lambda."""
+        if isinstance(file_lambda, ScanScanFilter):
+            return file_lambda._matcher
+        return file_lambda
+
+    def __and__(self, other):
+        """Return a filter that matches both filters."""
+        return And(self, other)
+
+    def __or__(self, other):
+        """Return a filter that matches either filter."""
+        return Or(self, other)
+
+    def __invert__(self):
+        """Return a filter that matches when this filter doesn't."""
+        return Not(self)
+
+    def __getstate__(self):
+        """Pickle the filter without its compiled function."""
+        state = dict(self.__dict__)
+        state.pop("_matcher", None)
+        return state
+
+    def __repr__(self):
+        """Me as a string."""
+        args = ", ".join(
+            repr(v) for k, v in self.__dict__.items() if not k.startswith("_")
+        )
+        return "%s(%s)" % (type(self).__name__, args)
+
+    def compile(self):
+        """Compile the filter into a function and remember it."""
+        consts = {}
+        source = self.source(consts)
+        if "_stat" in consts:
+            # The file is stat'ed at most once per call, by the first filter
+            # that needs it, and never cached between calls.
+            source = "(lambda _st: %s)([None])" % source
+        # The constants are bound as closure variables, which are faster to
+        # look up than globals.
+        names = sorted(consts)
+        factory = eval(
+            "lambda %s: lambda dir, filename: %s" % (", ".join(names), source), {}
+        )
+        self._matcher = factory(*[consts[name] for name in names])
+        return self._matcher
+
+    def source(self, consts):
+        """Return the python expression for this filter.
+
+        Keyword arguments:
+        consts -- a dict where any values used by the expression are added,
+            with their names.
+        """
+        raise NotImplementedError()
+
+    @staticmethod
+    def const(consts, value):
+        """Add a value to the constants and return its name."""
+        name = "_c%s" % len(consts)
+        consts[name] = value
+        return name
+
+    @staticmethod
+    def stat(st, dir, filename):
+        """Return the stat of the file, only calling os.stat the first time.
+
+        Keyword arguments:
+        st -- a list holding the stat of the file, or None, for a single call
+            of the filter.
+        """
+        if st[0] is None:
+            st[0] = os.stat(os.path.join(dir, filename))
+        return st[0]
+
+
+class Extension(ScanScanFilter):
+
+    """Matches the files that end with the extension."""
+
+    def __init__(self, extension):
+        """The extension is any string that must match the end of the file."""
+        self.extension = extension
+
+    def source(self, consts):
+        """Return the python expression for this filter."""
+        return "filename.endswith(%s)" % ScanScanFilter.const(consts, self.extension)
+
+
+class Include(ScanScanFilter):
+
+    """Matches the files with a string in their name."""
+
+    def __init__(self, include):
+        """The string must be present in the filename."""
+        self.include = include
+
+    def source(self, consts):
+        """Return the python expression for this filter."""
+        return "(%s in filename)" % ScanScanFilter.const(consts, self.include)
+
+
+class Exclude(ScanScanFilter):
+
+    """Matches the files without a string in their name."""
+
+    def __init__(self, exclude):
+        """The string must not be present in the filename."""
+        self.exclude = exclude
+
+    def source(self, consts):
+        """Return the python expression for this filter."""
+        return "(%s not in filename)" % ScanScanFilter.const(consts, self.exclude)
+
+
+class Tag(ScanScanFilter):
+
+    """Matches the files with a tag (see ScanScan.get_tag)."""
+
+    def __init__(self, tag):
+        """The tag for the file."""
+        self.tag = tag
+
+    def source(self, consts):
+        """Return the python expression for this filter."""
+        from scanscan import ScanScan
+
+        return "(%s(filename) == %s)" % (
+            ScanScanFilter.const(consts, ScanScan.get_tag),
+            ScanScanFilter.const(consts, self.tag),
+        )
+
+
+class Glob(ScanScanFilter):
+
+    """Matches the filenames with a shell-style wildcard pattern."""
+
+    def __init__(self, pattern):
+        """The pattern for the filename, like *.xml or pom-?.xml."""
+        self.pattern = pattern
+
+    def source(self, consts):
+        """Return the python expression for this filter."""
+        return Glob.source_any(consts, [self.pattern])
+
+    @staticmethod
+    def source_any(consts, patterns):
+        """Return the python expression that matches any of the patterns."""
+        regex = re.compile("|".join(fnmatch.translate(p) for p in patterns))
+        return "(%s(filename) is not None)" % ScanScanFilter.const(consts, regex.match)
+
+
+class Size(ScanScanFilter):
+
+    """Matches the files with a size in bytes in a range."""
+
+    def __init__(self, min=None, max=None):
+        """The minimum and maximum sizes are optional and inclusive."""
+        self.min = min
+        self.max = max
+
+    def source(self, consts):
+        """Return the python expression for this filter."""
+        return Size.source_range(consts, "st_size", self.min, self.max)
+
+    @staticmethod
+    def source_range(consts, attr, min, max):
+        """Return the python expression that checks a stat attribute."""
+        if min is None and max is None:
+            return "True"
+        consts["_stat"] = ScanScanFilter.stat
+        expr = "_stat(_st, dir, filename).%s" % attr
+        if min is not None:
+            expr = "%s <= %s" % (ScanScanFilter.const(consts, min), expr)
+        if max is not None:
+            expr = "%s <= %s" % (expr, ScanScanFilter.const(consts, max))
+        return "(%s)" % expr
+
+
+class Mtime(ScanScanFilter):
+
+    """Matches the files modified in a range of time."""
+
+    def __init__(self, after=None, before=None):
+        """The times are optional and inclusive, in seconds since the epoch."""
+        self.after = after
+        self.before = before
+
+    def source(self, consts):
+        """Return the python expression for this filter."""
+        return Size.source_range(consts, "st_mtime", self.after, self.before)
+
+
+class And(ScanScanFilter):
+
+    """Matches the files that match all of the filters."""
+
+    def __init__(self, *filters):
+        """Any nested And filters are flattened."""
+        self.filters = []
+        for f in filters:
+            self.filters.extend(f.filters if isinstance(f, And) else [f])
+
+    def source(self, consts):
+        """Return the python expression for this filter."""
+        if not self.filters:
+            return "True"
+        return "(%s)" % " and ".join(f.source(consts) for f in self.filters)
+
+
+class Or(ScanScanFilter):
+
+    """Matches the files that match any of the filters."""
+
+    def __init__(self, *filters):
+        """Any nested Or filters are flattened."""
+        self.filters = []
+        for f in filters:
+            self.filters.extend(f.filters if isinstance(f, Or) else [f])
+
+    def source(self, consts):
+        """Return the python expression for this filter.
+
+        All of the extensions are checked in one call, and all of the globs
+        with one regex.
+        """
+        extensions = tuple(f.extension for f in self.filters if type(f) is Extension)
+        globs = [f.pattern for f in self.filters if type(f) is Glob]
+        sources = [
+            f.source(consts)
+            for f in self.filters
+            if type(f) is not Extension and type(f) is not Glob
+        ]
+        if extensions:
+            const = ScanScanFilter.const(consts, extensions)
+            sources.insert(0, "filename.endswith(%s)" % const)
+        if globs:
+            sources.insert(0, Glob.source_any(consts, globs))
+        if not sources:
+            return "False"
+        return "(%s)" % " or ".join(sources)
+
+
+class Not(ScanScanFilter):
+
+    """Matches the files that don't match the filter."""
+
+    def __init__(self, filter):
+        """The filter to negate."""
+        self.filter = filter
+
+    def source(self, consts):
+        """Return the python expression for this filter."""
+        return "(not %s)" % self.filter.source(consts)
@@ -0,0 +1,248 @@
+#!/usr/bin/env python3
+# -*- mode: python -*-
+# -*- coding: utf-8 -*-
+
+##
+# Licensed to the Apache Software Foundation (ASF) under one
+# or more contributor license agreements.  See the NOTICE file
+# distributed with this work for additional information
+# regarding copyright ownership.  The ASF licenses this file
+# to you under the Apache License, Version 2.0 (the
+# "License"); you may not use this file except in compliance
+# with the License.  You may obtain a copy of the License at
+#
+# https://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+
+"""A persistent trigram index to find candidate files before searching them."""
+
+from scanscan import ScanScan
+
+import os
+import pickle
+import re
+
+try:
+    import re._parser as sre_parse
+except ImportError:  # Before python 3.11
+    import sre_parse
+
+
+class ScanScanIndex(ScanScan):
+
+    """A persistent trigram index to find candidate files before searching them.
+
+    Every file in the directory is reduced to the set of three character
+    strings it contains.  A file can only contain a literal if it contains all
+    of the trigrams of that literal, so most files can be excluded from a search
+    without being opened.  The index is refreshed from the file modification
+    times, so only new or modified files are read again.
+    """
+
+    # The format of the persisted index, changed when the contents change.
+    VERSION = 1
+
+    def __init__(self, dir, index_filename=None, file_lambda=None):
+        """Create an index over the directory.
+
+        Keyword arguments:
+        dir -- the directory to recursively index.
+        index_filename -- optional, the file where the index is persisted
+            between runs.
+        file_lambda -- optional, a function to apply on the path and filename
+            returning true if the file should be indexed.
+        """
+        super(ScanScanIndex, self).__init__()
+        self.dir = dir
+        self.index_filename = index_filename
+        self.file_lambda = file_lambda
+        # The relative path to (mtime, size, trigrams) for each indexed file.
+        # The trigrams are None if the file couldn't be read as text.
+        self.files = {}
+        self.__postings = None
+        if index_filename is not None and os.path.exists(index_filename):
+            self.load()
+
+    def load(self):
+        """Reload the index from its file, discarding it if it is out of date."""
+        with open(self.index_filename, "rb") as index_file:
+            saved = pickle.load(index_file)
+        if saved.get("version") == ScanScanIndex.VERSION:
+            self.files = saved["files"]
+            self.__postings = None
+
+    def save(self):
+        """Persist the index to its file."""
+        tmp_filename = self.index_filename + ".tmp"
+        with open(tmp_filename, "wb") as index_file:
+            pickle.dump(
+                {"version": ScanScanIndex.VERSION, "files": self.files},
+                index_file,
+                pickle.HIGHEST_PROTOCOL,
+            )
+        os.replace(tmp_filename, self.index_filename)
+
+    def update(self):
+        """Bring the index up to date with the directory.
+
+        Returns the number of files that were (re)indexed or removed.
+        """
+        changed = 0
+        found = set()
+        skip = None
+        if self.index_filename is not None:
+            skip = os.path.abspath(self.index_filename)
+        for root, fn in ScanScan.walk(self.dir, self.file_lambda):
+            if os.path.abspath(os.path.join(root, fn)) in (skip, "%s.tmp" % skip):
+                continue
+            path = os.path.relpath(os.path.join(root, fn), self.dir)
+            found.add(path)
+            try:
+                st = os.stat(os.path.join(root, fn))
+            except OSError:
+                # A dangling symbolic link, or a file removed during the walk,
+                # is kept as unreadable so that it is always a candidate.
+                if self.files.get(path) != (None, None, None):
+                    self.files[path] = (None, None, None)
+                    changed += 1
+                continue
+            indexed = self.files.get(path)
+            if indexed is not None and indexed[:2] == (st.st_mtime_ns, st.st_size):
+                continue
+            self.files[path] = (
+                st.st_mtime_ns,
+                st.st_size,
+                ScanScanIndex.read_trigrams(os.path.join(root, fn)),
+            )
+            changed += 1
+        for path in set(self.files) - found:
+            del self.files[path]
+            changed += 1
+        if changed:
+            self.__postings = None
+            if self.index_filename is not None:
+                self.save()
+        return changed
+
+    def candidates(self, literal):
+        """Return the sorted relative paths of files that might contain the literal."""
+        return self.__candidates(ScanScanIndex.trigrams(literal))
+
+    def candidates_regex(self, pattern):
+        """Return the sorted relative paths of files that might match the regex.
+
+        Only the literal text that every match requires is used to select the
+        files, which is always safe but might return more files than necessary.
+        """
+        required = set()
+        for literal in ScanScanIndex.required_literals(pattern):
+            required |= ScanScanIndex.trigrams(literal)
+        return self.__candidates(required)
+
+    def apply(self, search, content_lambda, die_on_not_applied=False):
+        """Rewrite only the files that might match the search regex.
+
+        Keyword arguments:
+        search -- a regex (string or compiled) that the content_lambda needs
+            to find in the file to rewrite it.
+        content_lambda -- a function to apply on the text of a file, returning
+            the new text.
+        die_on_not_applied -- raise an exception if a candidate file was not
+            rewritten.  Files excluded by the index are never checked, and
+            files that couldn't be read as text are skipped.
+
+        Returns the relative paths of the files that were rewritten.
+        """
+        self.update()
+        applied = []
+        for path in self.candidates_regex(search):
+            if self.files[path][2] is None:
+                continue
+            root, fn = os.path.split(os.path.join(self.dir, path))
+            if ScanScan.apply_file(root, fn, content_lambda, die_on_not_applied):
+                applied.append(path)
+        if applied:
+            self.update()
+        return applied
+
+    def __candidates(self, required):
+        """Return the sorted relative paths of files containing all the trigrams."""
+        if self.__postings is None:
+            self.__build_postings()
+        postings, unknown = self.__postings
+        if not required:
+            return sorted(self.files)
+        found = None
+        for trigram in sorted(required, key=lambda t: len(postings.get(t, ()))):
+            paths = postings.get(trigram, set())
+            found = set(paths) if found is None else found & paths
+            if not found:
+                break
+        return sorted(found | unknown)
+
+    def __build_postings(self):
+        """Invert the index to map each trigram to the files that contain it."""
+        postings = {}
+        unknown = set()
+        for path, (_, _, trigrams) in self.files.items():
+            if trigrams is None:
+                unknown.add(path)
+                continue
+            for trigram in trigrams:
+                postings.setdefault(trigram, set()).add(path)
+        self.__postings = (postings, unknown)
+
+    @staticmethod
+    def trigrams(text):
+        """Return the set of all three character substrings in the text."""
+        return {text[i:j] for i, j in enumerate(range(3, len(text) + 1))}
+
+    @staticmethod
+    def read_trigrams(filename):
+        """Return the trigrams in a file, or None if it can't be read as text."""
+        try:
+            with open(filename, "r") as content_file:
+                return frozenset(ScanScanIndex.trigrams(content_file.read()))
+        except (UnicodeDecodeError, OSError):
+            return None
+
+    @staticmethod
+    def required_literals(pattern):
+        """Return literal strings that must appear in any match of the regex.
+
+        Only the sequences of plain characters at the top level of the regex
+        are returned.  Anything that is optional, repeated, grouped or
+        alternated is skipped, and case insensitive regexes return nothing.
+        """
+        flags = 0
+        if hasattr(pattern, "pattern"):
+            flags = pattern.flags
+            pattern = pattern.pattern
+        if not isinstance(pattern, str):
+            return []
+        try:
+            parsed = sre_parse.parse(pattern, flags)
+        except re.error:
+            return []
+        # The global flags, including inline flags like (?i)
+        state = parsed.state if hasattr(parsed, "state") else parsed.pattern
+        if state.flags & re.IGNORECASE:
+            return []
+        literals = []
+        current = []
+        for op, av in parsed:
+            if op == sre_parse.LITERAL:
+                current.append(chr(av))
+                continue
+            if current:
+                literals.append("".join(current))
+                current = []
+        if current:
+            literals.append("".join(current))
+        return literals
@@ -0,0 +1,118 @@
+#!/usr/bin/env python3
+# -*- mode: python -*-
+# -*- coding: utf-8 -*-
+
+##
+# Licensed to the Apache Software Foundation (ASF) under one
+# or more contributor license agreements.  See the NOTICE file
+# distributed with this work for additional information
+# regarding copyright ownership.  The ASF licenses this file
+# to you under the Apache License, Version 2.0 (the
+# "License"); you may not use this file except in compliance
+# with the License.  You may obtain a copy of the License at
+#
+# https://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+
+"""A piece table to edit large text without copying it."""
+
+
+class ScanScanPieces(object):
+
+    """A piece table to edit large text without copying it.
+
+    The text is a list of pieces, where each piece is a slice of the original
+    text or of a string that was inserted.  Inserting or deleting only
+    splits the pieces around the edit, and the text is only copied when it
+    is materialized with str() (or bytes()).
+    """
+
+    def __init__(self, text):
+        """Create the piece table from the original text or bytes."""
+        self.empty = text[:0]
+        # The list of (buffer, start, end) slices that make up the text.
+        self.pieces = [(text, 0, len(text))] if text else []
+        self.length = len(text)
+
+    def __len__(self):
+        """The length of the text."""
+        return self.length
+
+    def __str__(self):
+        """Materialize the text."""
+        return self.materialize()
+
+    def __bytes__(self):
+        """Materialize the bytes."""
+        return self.materialize()
+
+    def materialize(self):
+        """Return the text, copying it once."""
+        if len(self.pieces) == 1:
+            buffer, start, end = self.pieces[0]
+            if start == 0 and end == len(buffer):
+                return buffer
+        return self.empty.join(buffer[start:end] for buffer, start, end in self.pieces)
+
+    def insert(self, pos, text):
+        """Insert the text at the position."""
+        if not text:
+            return self
+        i = self.__split(pos)
+        self.pieces.insert(i, (text, 0, len(text)))
+        self.length += len(text)
+        return self
+
+    def delete(self, start, end):
+        """Delete the text between the two positions."""
+        if end <= start:
+            return self
+        i = self.__split(start)
+        j = self.__split(end)
+        del self.pieces[i:j]
+        self.length -= end - start
+        return self
+
+    def search(self, pattern, pos=0):
+        """Search for a compiled regex in the text, starting at a position.
+
+        Each piece is searched in place, so a match can't span two pieces.
+
+        Returns a tuple of the start position, end position and the match, or
+        None if it wasn't found.
+        """
+        offset = 0
+        for buffer, start, end in self.pieces:
+            if offset + end - start > pos:
+                skip = max(pos - offset, 0)
+                match = pattern.search(buffer, start + skip, end)
+                if match is not None:
+                    return (
+                        offset + match.start() - start,
+                        offset + match.end() - start,
+                        match,
+                    )
+            offset += end - start
+        return None
+
+    def __split(self, pos):
+        """Split the pieces at the position, returning the index that starts there."""
+        if pos < 0 or pos > self.length:
+            raise IndexError("Position %s out of range" % pos)
+        offset = 0
+        for i, (buffer, start, end) in enumerate(self.pieces):
+            if offset == pos:
+                return i
+            if offset + end - start > pos:
+                middle = start + pos - offset
+                self.pieces[i] = (buffer, start, middle)
+                self.pieces.insert(i + 1, (buffer, middle, end))
+                return i + 1
+            offset += end - start
+        return len(self.pieces)
@@ -0,0 +1,118 @@
+#!/usr/bin/env python3
+# -*- mode: python -*-
+# -*- coding: utf-8 -*-
+
+##
+# Licensed to the Apache Software Foundation (ASF) under one
+# or more contributor license agreements.  See the NOTICE file
+# distributed with this work for additional information
+# regarding copyright ownership.  The ASF licenses this file
+# to you under the Apache License, Version 2.0 (the
+# "License"); you may not use this file except in compliance
+# with the License.  You may obtain a copy of the License at
+#
+# https://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+
+"""Update the versions of Maven artifacts in a POM."""
+
+from scanscan import ScanScan
+
+import re
+
+
+class ScanScanPom(ScanScan):
+
+    """Update the versions of Maven artifacts in a POM.
+
+    The POM is scanned once from start to end, following the elements with
+    a <groupId>, <artifactId> and <version> such as the project, its parent,
+    dependencies and plugins.  Only the text of the matching <version>
+    elements is replaced, and comments are ignored.
+    """
+
+    # The markup in an XML document, where an element start or end tag has the
+    # groups end, name and empty.
+    fetch_markup = re.compile(
+        r"<!--.*?-->|<!\[CDATA\[.*?\]\]>|<\?.*?\?>|<![^>]*>"
+        r"|<(?P<end>/?)(?P<name>[^\s/>]+)[^>]*?(?P<empty>/?)>",
+        re.DOTALL,
+    )
+
+    # The default groupId for Maven plugins.
+    plugins_group_id = "org.apache.maven.plugins"
+
+    @staticmethod
+    def content_replace_versions(versions):
+        """Return a lambda that sets the versions of artifacts in a POM.
+
+        Versions that refer to a property like ${avro.version} are left alone.
+        The lambda returns None if no version was changed.
+
+        Keyword arguments:
+        versions -- a dict from "groupId:artifactId" to the new version.
+        """
+
+        def content_replace_versions_method(input):
+            edits = []
+            # The open elements, each with the spans of its coordinates.
+            stack = [{}]
+            for match in ScanScanPom.fetch_markup.finditer(input):
+                name = match.group("name")
+                if name is None or match.group("empty"):
+                    continue
+                if not match.group("end"):
+                    stack.append({"name": name, "start": match.end()})
+                    continue
+                if len(stack) == 1 or stack[-1]["name"] != name:
+                    continue
+                element = stack.pop()
+                parent = stack[-1]
+                if name in ("groupId", "artifactId", "version"):
+                    parent[name] = (element["start"], match.start())
+                    continue
+                if name == "parent" and "groupId" in element:
+                    parent["parentGroupId"] = element["groupId"]
+                if "artifactId" not in element or "version" not in element:
+                    continue
+
+                if "groupId" in element:
+                    group_id = input[slice(*element["groupId"])].strip()
+                elif name == "project" and "parentGroupId" in element:
+                    group_id = input[slice(*element["parentGroupId"])].strip()
+                elif name == "plugin":
+                    group_id = ScanScanPom.plugins_group_id
+                else:
+                    continue
+                artifact_id = input[slice(*element["artifactId"])].strip()
+                version = versions.get("%s:%s" % (group_id, artifact_id))
+                start, end = element["version"]
+                old_version = input[start:end].strip()
+                if (
+                    version is not None
+                    and version != old_version
+                    and not old_version.startswith("${")
+                ):
+                    # Keep any whitespace around the version.
+                    start = input.index(old_version, start)
+                    edits.append((start, start + len(old_version), version))
+
+            if not edits:
+                return None
+            edits.sort()
+            output = []
+            last = 0
+            for start, end, version in edits:
+                output.append(input[last:start])
+                output.append(version)
+                last = end
+            output.append(input[last:])
+            return "".join(output)
+
+        return content_replace_versions_method
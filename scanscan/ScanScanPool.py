@@ -0,0 +1,224 @@
+#!/usr/bin/env python3
+# -*- mode: python -*-
+# -*- coding: utf-8 -*-
+
+##
+# Licensed to the Apache Software Foundation (ASF) under one
+# or more contributor license agreements.  See the NOTICE file
+# distributed with this work for additional information
+# regarding copyright ownership.  The ASF licenses this file
+# to you under the Apache License, Version 2.0 (the
+# "License"); you may not use this file except in compliance
+# with the License.  You may obtain a copy of the License at
+#
+# https://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+
+"""Process files in worker processes that are killed if they take too long."""
+
+from scanscan import ScanScan
+
+import multiprocessing
+import multiprocessing.connection
+import os
+import signal
+import time
+
+
+class ScanScanPool(object):
+
+    """Process files in worker processes that are killed if they take too long.
+
+    Python regexes can't be interrupted, and some patterns take exponential
+    time on unlucky input.  The workers are forked once with the function to
+    apply, so it doesn't need to be pickled, and are reused for each file.  A
+    worker that doesn't finish a file before the deadline is killed and
+    replaced, the file is recorded in timed_out, and the other files are
+    processed as usual.
+    """
+
+    def __init__(self, process, processes=None, timeout=60.0):
+        """Create the pool, without starting any workers.
+
+        Keyword arguments:
+        process -- a function to apply on the path of each file in a worker,
+            returning a result that can be pickled.
+        processes -- optional, the number of workers.  By default, one per CPU.
+        timeout -- the number of seconds a worker can spend on one file.
+        """
+        self.process = process
+        self.processes = processes or os.cpu_count() or 1
+        self.timeout = timeout
+        # The paths of the files that took too long.
+        self.timed_out = []
+        # The (path, message) of the files that raised an exception.
+        self.errors = []
+        self.__context = multiprocessing.get_context("fork")
+        self.__workers = []
+        # The connections of the workers that are processing a file.
+        self.__busy = set()
+
+    def __enter__(self):
+        """Start the workers."""
+        self.start()
+        return self
+
+    def __exit__(self, t, v, tb):
+        """Stop the workers."""
+        self.close()
+
+    def start(self):
+        """Start the workers, if they aren't already running."""
+        while len(self.__workers) < self.processes:
+            self.__workers.append(self.__fork())
+
+    def close(self):
+        """Stop the workers once they are idle, killing any busy workers.
+
+        A worker is only busy here if map was interrupted, and it could be
+        stuck on a file forever.
+        """
+        for worker, conn in self.__workers:
+            if conn in self.__busy:
+                ScanScanPool.__kill(worker)
+            else:
+                conn.send(None)
+        for worker, conn in self.__workers:
+            # An idle worker exits as soon as it receives None.
+            worker.join(self.timeout)
+            if worker.is_alive():
+                ScanScanPool.__kill(worker)
+            conn.close()
+        self.__workers = []
+        self.__busy = set()
+
+    def map(self, paths):
+        """Process the files, returning a dict of the path to its result.
+
+        The files that took too long or raised an exception aren't included.
+        """
+        self.start()
+        results = {}
+        paths = iter(paths)
+        idle = list(self.__workers)
+        # The connection to the (worker, path, deadline) being processed.
+        busy = {}
+        while True:
+            while idle:
+                path = next(paths, None)
+                if path is None:
+                    break
+                worker, conn = idle.pop()
+                self.__busy.add(conn)
+                conn.send(path)
+                busy[conn] = (worker, path, time.monotonic() + self.timeout)
+            if not busy:
+                return results
+
+            deadline = min(d for _, _, d in busy.values())
+            ready = multiprocessing.connection.wait(
+                list(busy), max(deadline - time.monotonic(), 0)
+            )
+            for conn in ready:
+                worker, path, _ = busy.pop(conn)
+                self.__busy.discard(conn)
+                try:
+                    status, result = conn.recv()
+                    idle.append((worker, conn))
+                except EOFError:
+                    # The worker died, for example if it ran out of memory.
+                    status, result = "error", "Worker exited"
+                    idle.append(self.__replace(worker, conn))
+                if status == "ok":
+                    results[path] = result
+                else:
+                    self.errors.append((path, result))
+
+            now = time.monotonic()
+            for conn, (worker, path, deadline) in list(busy.items()):
+                if deadline <= now:
+                    del busy[conn]
+                    self.timed_out.append(path)
+                    idle.append(self.__replace(worker, conn))
+
+    def apply_recursive(self, dir, file_lambda=None, files=None):
+        """Process the files in a directory (see ScanScan.walk).
+
+        Returns a dict of the path to the result for each file.
+        """
+        return self.map(
+            os.path.join(root, fn)
+            for root, fn in ScanScan.walk(dir, file_lambda, files)
+        )
+
+    @staticmethod
+    def content(content_lambda, **apply_options):
+        """Return a process function that rewrites the file content.
+
+        The file is rewritten atomically (see ScanScan.apply_file), so a worker
+        killed after the deadline never leaves it partly written.
+
+        Keyword arguments:
+        content_lambda -- a function to apply on the text of a file, returning
+            the new text.
+        apply_options -- any other options for ScanScan.apply_file, such as
+            the encoding.
+        """
+
+        def content_method(path):
+            root, fn = os.path.split(path)
+            return ScanScan.apply_file(
+                root, fn, content_lambda, atomic=True, **apply_options
+            )
+
+        return content_method
+
+    def __fork(self):
+        """Start a new worker, returning it with its connection."""
+        conn, worker_conn = self.__context.Pipe()
+        worker = self.__context.Process(
+            target=ScanScanPool.__work,
+            args=(worker_conn, self.process),
+            name="ScanScanPool",
+            daemon=True,
+        )
+        worker.start()
+        worker_conn.close()
+        return worker, conn
+
+    def __replace(self, worker, conn):
+        """Kill a worker and replace it with a new one."""
+        self.__busy.discard(conn)
+        ScanScanPool.__kill(worker)
+        conn.close()
+        self.__workers.remove((worker, conn))
+        replacement = self.__fork()
+        self.__workers.append(replacement)
+        return replacement
+
+    @staticmethod
+    def __kill(worker):
+        """Kill a worker and wait for it to exit.
+
+        Process.kill only exists since python 3.7.
+        """
+        os.kill(worker.pid, signal.SIGKILL)
+        worker.join()
+
+    @staticmethod
+    def __work(conn, process):
+        """Process each path received, until None is received."""
+        while True:
+            path = conn.recv()
+            if path is None:
+                break
+            try:
+                conn.send(("ok", process(path)))
+            except Exception as e:
+                conn.send(("error", repr(e)))
@@ -0,0 +1,263 @@
+#!/usr/bin/env python3
+# -*- mode: python -*-
+# -*- coding: utf-8 -*-
+
+##
+# Licensed to the Apache Software Foundation (ASF) under one
+# or more contributor license agreements.  See the NOTICE file
+# distributed with this work for additional information
+# regarding copyright ownership.  The ASF licenses this file
+# to you under the Apache License, Version 2.0 (the
+# "License"); you may not use this file except in compliance
+# with the License.  You may obtain a copy of the License at
+#
+# https://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+
+"""Apply a list of rules from a file to a directory in one walk."""
+
+from scanscan import ScanScan, ScanScanError
+from scanscan.ScanScanFilter import (
+    And,
+    Exclude,
+    Extension,
+    Glob,
+    Include,
+    Or,
+    Tag,
+)
+
+import functools
+import os
+import time
+
+
+class ScanScanRules(ScanScan):
+
+    """Apply a list of rules from a file to a directory in one walk.
+
+    Each rule has an optional "files" filter and one content transformation.
+    The rules can be loaded from JSON or YAML, for example:
+
+    rules:
+      - files: {endswith: .xml, include: pom}
+        replace: {search: "<version>1.0</version>", replace: "..."}
+      - add_next: {test: "import os", to_add: "import re"}
+      - add_prev: {test: "import re", to_add: "import os"}
+      - xml_comment: {comment: "Dependencies", replacement: "..."}
+      - pom_versions: {"org.apache.avro:avro": "1.11.1"}
+
+    The files filter accepts endswith, include, exclude, tag and glob.  Every
+    file is read once, all of the matching rules are applied to it in order,
+    and it is written once if any of them modified it.
+    """
+
+    def __init__(self, rules, dry_run=False, **apply_options):
+        """Create the rules.
+
+        Keyword arguments:
+        rules -- a list of (filter, content_lambda) where the filter is a
+            ScanScanFilter or None to match all files.
+        dry_run -- optional, if true the files are never written.
+        apply_options -- any other options for ScanScan.apply_file, such as
+            the encoding.
+        """
+        super(ScanScanRules, self).__init__()
+        self.rules = rules
+        self.dry_run = dry_run
+        self.apply_options = apply_options
+        # Statistics from the last run.
+        self.stats = {}
+        # The compiled filter of each rule with its content lambda.
+        self.__matchers = None
+
+    @staticmethod
+    def load(filename, **options):
+        """Load the rules from a JSON or YAML file.
+
+        Keyword arguments:
+        filename -- the file containing the rules.
+        options -- any other options for the ScanScanRules.
+        """
+        with open(filename, "r", encoding="utf-8") as rules_file:
+            if filename.endswith((".yaml", ".yml")):
+                try:
+                    import yaml
+                except ImportError:
+                    raise ScanScanError("PyYAML is required to read %s" % filename)
+                spec = yaml.safe_load(rules_file)
+            else:
+                import json
+
+                spec = json.load(rules_file)
+        return ScanScanRules.from_spec(spec, **options)
+
+    @staticmethod
+    def from_spec(spec, **options):
+        """Create the rules from a dict or list, as loaded from a file."""
+        if isinstance(spec, dict):
+            spec = spec.get("rules", [])
+        rules = []
+        for rule in spec:
+            rule = dict(rule)
+            filter = ScanScanRules.filter(rule.pop("files", None))
+            rule.pop("name", None)
+            if len(rule) != 1:
+                raise ScanScanError("Expected one transformation in %s" % rule)
+            kind, args = next(iter(rule.items()))
+            try:
+                rules.append((filter, ScanScanRules.content(kind, args)))
+            except KeyError as e:
+                raise ScanScanError("Missing %s in %s" % (e, rule))
+        return ScanScanRules(rules, **options)
+
+    @staticmethod
+    def filter(spec):
+        """Return the ScanScanFilter for the files of a rule, or None."""
+        if spec is None:
+            return None
+        filters = []
+        for key, value in spec.items():
+            if key == "endswith":
+                filters.append(Extension(value))
+            elif key == "include":
+                filters.append(Include(value))
+            elif key == "exclude":
+                filters.append(Exclude(value))
+            elif key == "tag":
+                filters.append(Tag(value))
+            elif key == "glob":
+                filters.append(Glob(value))
+            else:
+                raise ScanScanError("Unknown file filter %s" % key)
+        return And(*filters)
+
+    @staticmethod
+    def content(kind, args):
+        """Return the content lambda for a transformation of a rule."""
+        if kind == "replace":
+            return ScanScan.content_replace(args["search"], args["replace"])
+        if kind == "add_next":
+            return ScanScan.content_test_and_add_next(args["test"], args["to_add"])
+        if kind == "add_prev":
+            return ScanScan.content_test_and_add_prev(args["test"], args["to_add"])
+        if kind == "xml_comment":
+            return ScanScan.content_replace_xml_by_comment_delimiter(
+                args["comment"], args["replacement"]
+            )
+        if kind == "pom_versions":
+            from scanscan.ScanScanPom import ScanScanPom
+
+            return ScanScanPom.content_replace_versions(args)
+        raise ScanScanError("Unknown rule %s" % kind)
+
+    def file_filter(self):
+        """Return a filter matching the files of any rule, or None for all."""
+        if any(f is None for f, _ in self.rules):
+            return None
+        return Or(*[f for f, _ in self.rules])
+
+    def content_lambda(self, root, fn):
+        """Return a function that applies all the matching rules, or None."""
+        if self.__matchers is None:
+            # Call the compiled filters directly for every file.
+            self.__matchers = [
+                (None if f is None else f.matcher(), content_lambda)
+                for f, content_lambda in self.rules
+            ]
+        content_lambdas = [
+            content_lambda
+            for matcher, content_lambda in self.__matchers
+            if matcher is None or matcher(root, fn)
+        ]
+        if not content_lambdas:
+            return None
+
+        def content_lambda_method(input):
+            content = input
+            for content_lambda in content_lambdas:
+                applied = content_lambda(content)
+                if applied is not None:
+                    content = applied
+            return None if content == input else content
+
+        return content_lambda_method
+
+    def process(self, path, atomic=False):
+        """Apply the rules to one file, returning true if it was modified.
+
+        Keyword arguments:
+        path -- the path to the file.
+        atomic -- optional, if true the file is rewritten atomically (see
+            ScanScan.apply_file).
+        """
+        root, fn = os.path.split(path)
+        content_lambda = self.content_lambda(root, fn)
+        if content_lambda is None:
+            return False
+        if not self.dry_run:
+            return ScanScan.apply_file(
+                root, fn, content_lambda, atomic=atomic, **self.apply_options
+            )
+        changed = []
+
+        def check(content):
+            changed.append(content_lambda(content) is not None)
+            return None
+
+        ScanScan.apply_file(root, fn, check, **self.apply_options)
+        return bool(changed) and changed[0]
+
+    def apply_recursive(self, dir, files=None, processes=1, timeout=60.0):
+        """Apply the rules to the files in a directory in one walk.
+
+        Keyword arguments:
+        dir -- the directory to recursively seach
+        files -- optional, the paths relative to the directory to process
+            instead of walking it (see ScanScan.walk).
+        processes -- optional, the number of worker processes.  With more
+            than one, each file is processed in a ScanScanPool.
+        timeout -- the number of seconds a worker can spend on one file.
+
+        Returns the paths of the files that were (or would be) modified.
+        """
+        start = time.monotonic()
+        paths = (
+            os.path.join(root, fn)
+            for root, fn in ScanScan.walk(dir, self.file_filter(), files)
+        )
+        timed_out = []
+        errors = []
+        if processes > 1:
+            from scanscan.ScanScanPool import ScanScanPool
+
+            # A worker killed at the deadline must not leave a partial file.
+            process = functools.partial(self.process, atomic=True)
+            with ScanScanPool(process, processes, timeout) as pool:
+                results = pool.map(paths)
+            timed_out = pool.timed_out
+            errors = pool.errors
+        else:
+            # Like the workers of the pool, a file that fails doesn't stop the
+            # other files from being processed.
+            results = {}
+            for path in paths:
+                try:
+                    results[path] = self.process(path)
+                except Exception as e:
+                    errors.append((path, repr(e)))
+        modified = sorted(path for path, changed in results.items() if changed)
+        self.stats = {
+            "files": len(results) + len(timed_out) + len(errors),
+            "modified": len(modified),
+            "timed_out": timed_out,
+            "errors": errors,
+            "seconds": time.monotonic() - start,
+        }
+        return modified
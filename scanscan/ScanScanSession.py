@@ -0,0 +1,176 @@
+#!/usr/bin/env python3
+# -*- mode: python -*-
+# -*- coding: utf-8 -*-
+
+##
+# Licensed to the Apache Software Foundation (ASF) under one
+# or more contributor license agreements.  See the NOTICE file
+# distributed with this work for additional information
+# regarding copyright ownership.  The ASF licenses this file
+# to you under the Apache License, Version 2.0 (the
+# "License"); you may not use this file except in compliance
+# with the License.  You may obtain a copy of the License at
+#
+# https://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+
+"""Modify many files and write them all together."""
+
+from scanscan.ScanScanFile import ScanScanFile
+
+import os
+import shutil
+import tempfile
+
+
+class ScanScanSession(object):
+
+    """Modify many files and write them all together.
+
+    The files opened in a session are only written when it is committed, or
+    when the session is used as a context manager and exits without an
+    exception.  Every modified file is written to a temporary file beside it
+    first, then all of them are renamed over the originals.  If anything
+    fails, the originals that were already replaced are restored, so either
+    all or none of the files are modified.
+
+    Symbolic links are followed, and the file they point to is replaced.  A
+    file with other hard links is replaced by a new file, so the other links
+    keep the original content.
+    """
+
+    def __init__(self, fsync=False, **file_options):
+        """Create an empty session.
+
+        Keyword arguments:
+        fsync -- optional, if true the files and then their directories are
+            flushed to disk before the commit returns.
+        file_options -- any other options for the ScanScanFile instances
+            opened by this session, such as the encoding.
+        """
+        self.fsync = fsync
+        self.file_options = file_options
+        # The filename to the ScanScanFile opened in this session.
+        self.files = {}
+
+    def __enter__(self):
+        """Start the session."""
+        return self
+
+    def __exit__(self, t, v, tb):
+        """Commit the session if no exception occurred, otherwise discard it."""
+        if t is None:
+            self.commit()
+
+    def open(self, filename):
+        """Return the ScanScanFile for the filename in this session."""
+        ssf = self.files.get(filename)
+        if ssf is None:
+            ssf = ScanScanFile(filename, **self.file_options)
+            self.files[filename] = ssf
+        return ssf
+
+    def add(self, ssf):
+        """Add an existing ScanScanFile to this session."""
+        self.files[ssf.filename] = ssf
+        return ssf
+
+    def commit(self):
+        """Write all of the modified files.
+
+        Returns the filenames that were written.
+        """
+        modified = [ssf for ssf in self.files.values() if ssf.dirty]
+        # The (file, real filename, temporary file) for each modified file.
+        journal = []
+        # The (real filename, backup filename) for each replaced file.
+        replaced = []
+        try:
+            for ssf in modified:
+                target = os.path.realpath(ssf.filename)
+                tmp = ScanScanSession.__write_temporary(ssf, target, self.fsync)
+                journal.append((ssf, target, tmp))
+            for ssf, target, tmp in journal:
+                backup = None
+                if os.path.exists(target):
+                    backup = tmp + ".bak"
+                    ScanScanSession.__backup(target, backup)
+                try:
+                    os.replace(tmp, target)
+                except BaseException:
+                    if backup is not None:
+                        os.remove(backup)
+                    raise
+                replaced.append((target, backup))
+        except BaseException:
+            for filename, backup in reversed(replaced):
+                if backup is None:
+                    os.remove(filename)
+                else:
+                    os.replace(backup, filename)
+            for _, _, tmp in journal:
+                if os.path.exists(tmp):
+                    os.remove(tmp)
+            raise
+
+        if self.fsync:
+            ScanScanSession.fsync_dirs(
+                {os.path.dirname(os.path.abspath(f)) for f, _ in replaced}
+            )
+        for _, backup in replaced:
+            if backup is not None:
+                os.remove(backup)
+        for ssf in modified:
+            ssf.dirty = False
+        return [ssf.filename for ssf in modified]
+
+    @staticmethod
+    def __write_temporary(ssf, target, fsync):
+        """Write the file content to a new temporary file beside the target."""
+        dir, fn = os.path.split(target)
+        fd, tmp = tempfile.mkstemp(prefix=".%s." % fn, suffix=".tmp", dir=dir)
+        os.close(fd)
+        try:
+            ssf.write_file(tmp, fsync)
+            if os.path.exists(target):
+                shutil.copymode(target, tmp)
+            else:
+                # mkstemp creates the file for the owner only.
+                os.chmod(tmp, 0o666 & ~ScanScanSession.umask())
+        except BaseException:
+            os.remove(tmp)
+            raise
+        return tmp
+
+    @staticmethod
+    def __backup(filename, backup):
+        """Keep the original file, with a hard link if possible."""
+        try:
+            os.link(filename, backup)
+        except OSError:
+            shutil.copy2(filename, backup)
+
+    @staticmethod
+    def umask():
+        """Return the umask of the process, which can only be read by setting it."""
+        mask = os.umask(0o022)
+        os.umask(mask)
+        return mask
+
+    @staticmethod
+    def fsync_dirs(dirs):
+        """Flush the directories to disk, so that renames are durable."""
+        if not hasattr(os, "O_DIRECTORY"):
+            return
+        for dir in sorted(dirs):
+            fd = os.open(dir, os.O_RDONLY | os.O_DIRECTORY)
+            try:
+                os.fsync(fd)
+            finally:
+                os.close(fd)
@@ -0,0 +1,139 @@
+#!/usr/bin/env python3
+# -*- mode: python -*-
+# -*- coding: utf-8 -*-
+
+##
+# Licensed to the Apache Software Foundation (ASF) under one
+# or more contributor license agreements.  See the NOTICE file
+# distributed with this work for additional information
+# regarding copyright ownership.  The ASF licenses this file
+# to you under the Apache License, Version 2.0 (the
+# "License"); you may not use this file except in compliance
+# with the License.  You may obtain a copy of the License at
+#
+# https://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+
+"""An index of the files in a directory by their tag."""
+
+from scanscan import ScanScan
+from scanscan.ScanScanFilter import ScanScanFilter
+
+import os
+
+
+class ScanScanTagIndex(ScanScan):
+
+    """An index of the files in a directory by their tag.
+
+    The directory is walked once to find the tag and version of every file
+    (see ScanScan.get_tag), and the index is only rebuilt when the
+    modification time of one of its directories changes, which happens when a
+    file is added, removed or renamed.
+    """
+
+    # The shared indexes created by ScanScanTagIndex.cached
+    __cached = {}
+
+    def __init__(self, dir, file_lambda=None):
+        """Create an index of the directory.
+
+        Keyword arguments:
+        dir -- the directory to recursively index.
+        file_lambda -- optional, a function to apply on the path and filename
+            returning true if the file should be indexed.
+        """
+        super(ScanScanTagIndex, self).__init__()
+        self.dir = dir
+        self.file_lambda = file_lambda
+        # The tag to a list of (path, version) for each file.
+        self.tags = {}
+        # The modification time of each directory when the index was built.
+        self.__mtimes = None
+
+    @staticmethod
+    def cached(dir):
+        """Return a shared, up to date index for the directory."""
+        key = os.path.abspath(dir)
+        index = ScanScanTagIndex.__cached.get(key)
+        if index is None:
+            index = ScanScanTagIndex(dir)
+            ScanScanTagIndex.__cached[key] = index
+        index.refresh()
+        return index
+
+    def is_current(self):
+        """Return true if no directory was modified since the index was built."""
+        if self.__mtimes is None:
+            return False
+        try:
+            return all(
+                os.stat(dir).st_mtime_ns == mtime
+                for dir, mtime in self.__mtimes.items()
+            )
+        except FileNotFoundError:
+            return False
+
+    def refresh(self):
+        """Rebuild the index if the directory was modified.
+
+        Returns true if the index was rebuilt.
+        """
+        if self.is_current():
+            return False
+        tags = {}
+        mtimes = {}
+        file_lambda = ScanScanFilter.unwrap(self.file_lambda)
+        for root, dirs, files in os.walk(self.dir):
+            mtimes[root] = os.stat(root).st_mtime_ns
+            for fn in files:
+                if file_lambda is not None and not file_lambda(root, fn):
+                    continue
+                tags.setdefault(ScanScan.get_tag(fn), []).append(
+                    (os.path.join(root, fn), ScanScan.get_version(fn))
+                )
+        self.tags = tags
+        self.__mtimes = mtimes
+        return True
+
+    def has_tag(self, tag):
+        """Return true if any file has the tag."""
+        self.refresh()
+        return tag in self.tags
+
+    def files(self, tag, extension=None, include=None, exclude=None):
+        """Return the paths of the files with the tag.
+
+        Keyword arguments:
+        tag -- the tag for the file (see ScanScan.get_tag).
+        extension - optional, a string that must match the end of the file.
+        include - optional, a string that must be present in the filename.
+        exclude - optional, a string that must not be present in the filename.
+        """
+        return self.files_for_tags([tag], extension, include, exclude)[tag]
+
+    def files_for_tags(self, tags, extension=None, include=None, exclude=None):
+        """Return the paths of the files for each tag in a dict.
+
+        This accepts the same optional arguments as ScanScanTagIndex.files.
+        """
+        self.refresh()
+        found = {}
+        for tag in tags:
+            paths = []
+            for path, _ in self.tags.get(tag, ()):
+                filename = os.path.basename(path)
+                if (
+                    (extension is None or filename.endswith(extension))
+                    and (include is None or include in filename)
+                    and (exclude is None or exclude not in filename)
+                ):
+                    paths.append(path)
+            found[tag] = paths
+        return found
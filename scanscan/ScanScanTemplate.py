@@ -55,6 +55,8 @@ class ScanScanTemplate(ScanScanFile):
     def write(self):
         r"""Override the write to append an integer value to the filename."""
         self.filename = self.__save_filename % self.__count
+        # Always write the output file, even if the template wasn't modified.
+        self.dirty = True
         super(ScanScanTemplate, self).write()
         self.load(self.__tmpl_filename)
         self.__count = self.__count + 1
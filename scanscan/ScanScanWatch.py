@@ -0,0 +1,259 @@
+#!/usr/bin/env python3
+# -*- mode: python -*-
+# -*- coding: utf-8 -*-
+
+##
+# Licensed to the Apache Software Foundation (ASF) under one
+# or more contributor license agreements.  See the NOTICE file
+# distributed with this work for additional information
+# regarding copyright ownership.  The ASF licenses this file
+# to you under the Apache License, Version 2.0 (the
+# "License"); you may not use this file except in compliance
+# with the License.  You may obtain a copy of the License at
+#
+# https://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+
+"""Watch a directory and rewrite the files that are created or modified."""
+
+from scanscan import ScanScan
+from scanscan.ScanScanFilter import ScanScanFilter
+
+import ctypes
+import ctypes.util
+import os
+import select
+import struct
+import sys
+import threading
+import time
+
+# Constants from <sys/inotify.h>
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_Q_OVERFLOW = 0x00004000
+IN_ISDIR = 0x40000000
+IN_NONBLOCK = 0x00000800
+IN_CLOEXEC = 0x00080000
+
+# The fixed size part of a struct inotify_event: wd, mask, cookie and len.
+INOTIFY_EVENT = struct.Struct("iIII")
+
+
+class ScanScanWatch(ScanScan):
+
+    """Watch a directory and rewrite the files that are created or modified.
+
+    On Linux, the changes are detected with inotify, otherwise the directory
+    is polled and compared to the file sizes and modification times of the
+    previous scan.  Changes are collected until none have been detected for
+    the debounce delay, and then rewritten together.  The files that this
+    watcher rewrites itself are ignored.
+    """
+
+    def __init__(
+        self,
+        dir,
+        content_lambda,
+        file_lambda=None,
+        debounce=0.2,
+        poll_interval=1.0,
+        use_inotify=None,
+        **apply_options
+    ):
+        """Create a watcher on the directory.
+
+        Keyword arguments:
+        dir -- the directory to recursively watch
+        content_lambda -- a function to apply on the text of a file, returning
+            the new text.
+        file_lambda -- optional, a function to apply on the path and filename
+            returning true if the file should be processed.
+        debounce -- the number of seconds without any changes before the
+            modified files are rewritten.
+        poll_interval -- the number of seconds between scans when polling.
+        use_inotify -- optional, true or false to force or prevent using
+            inotify.  By default, it's used when available.
+        apply_options -- any other options for ScanScan.apply_file, such as
+            the encoding.
+        """
+        super(ScanScanWatch, self).__init__()
+        self.dir = dir
+        self.content_lambda = content_lambda
+        self.file_lambda = file_lambda
+        self.debounce = debounce
+        self.poll_interval = poll_interval
+        if use_inotify is None:
+            use_inotify = sys.platform.startswith("linux")
+        self.use_inotify = use_inotify
+        self.apply_options = apply_options
+        # Set when the watcher is detecting changes.
+        self.ready = threading.Event()
+        # The number of batches and files that were rewritten.
+        self.batch_count = 0
+        self.applied_count = 0
+        # The (path, message) of the files that raised an exception.
+        self.errors = []
+        self.__stop = threading.Event()
+        # The path to the (mtime, size) of files written by this watcher.
+        self.__written = {}
+
+    def stop(self):
+        """Request the watcher to stop, usually from another thread."""
+        self.__stop.set()
+
+    def run(self, max_batches=None):
+        """Watch the directory until stopped, rewriting the changed files.
+
+        Keyword arguments:
+        max_batches -- optional, stop after rewriting this many batches.
+        """
+        if self.use_inotify:
+            changes = self.__inotify_changes()
+        else:
+            changes = self.__poll_changes()
+        pending = set()
+        last_change = 0
+        try:
+            while not self.__stop.is_set():
+                changed = {path for path in next(changes) if not self.__own(path)}
+                if changed:
+                    pending |= changed
+                    last_change = time.monotonic()
+                elif pending and time.monotonic() - last_change >= self.debounce:
+                    self.apply_batch(pending)
+                    pending = set()
+                    if max_batches is not None and self.batch_count >= max_batches:
+                        break
+        finally:
+            changes.close()
+            self.ready.clear()
+
+    def apply_batch(self, paths):
+        """Rewrite the files at the given paths.
+
+        A file that raises an exception, for example because it was removed
+        or can't be decoded, is recorded in the errors and skipped.
+
+        Returns the paths that were rewritten.
+        """
+        applied = []
+        file_lambda = ScanScanFilter.unwrap(self.file_lambda)
+        for path in sorted(paths):
+            root, fn = os.path.split(path)
+            if file_lambda is not None and not file_lambda(root, fn):
+                continue
+            if not os.path.isfile(path):
+                continue
+            try:
+                if not ScanScan.apply_file(
+                    root, fn, self.content_lambda, **self.apply_options
+                ):
+                    continue
+                st = os.stat(path)
+            except Exception as e:
+                self.errors.append((path, repr(e)))
+                continue
+            self.__written[path] = (st.st_mtime_ns, st.st_size)
+            applied.append(path)
+        self.batch_count += 1
+        self.applied_count += len(applied)
+        return applied
+
+    def __own(self, path):
+        """Return true if the file is unchanged since this watcher rewrote it."""
+        written = self.__written.pop(path, None)
+        if written is None:
+            return False
+        try:
+            st = os.stat(path)
+        except FileNotFoundError:
+            return False
+        return written == (st.st_mtime_ns, st.st_size)
+
+    def __poll_changes(self):
+        """Generate the set of files that changed between each scan."""
+        snapshot = ScanScanWatch.scan(self.dir)
+        self.ready.set()
+        while True:
+            self.__stop.wait(self.poll_interval)
+            current = ScanScanWatch.scan(self.dir)
+            yield {path for path, st in current.items() if snapshot.get(path) != st}
+            snapshot = current
+
+    def __inotify_changes(self):
+        """Generate the set of files that changed since the last check."""
+        libc = ctypes.CDLL(ctypes.util.find_library("c"), use_errno=True)
+        fd = libc.inotify_init1(IN_NONBLOCK | IN_CLOEXEC)
+        if fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1")
+        watches = {}
+
+        def watch(dir):
+            """Add a watch to the directory and all of its subdirectories."""
+            found = set()
+            for root, dirs, files in os.walk(dir):
+                wd = libc.inotify_add_watch(
+                    fd,
+                    os.fsencode(root),
+                    IN_CLOSE_WRITE | IN_MOVED_TO | IN_CREATE,
+                )
+                if wd >= 0:
+                    watches[wd] = root
+                found.update(os.path.join(root, fn) for fn in files)
+            return found
+
+        try:
+            watch(self.dir)
+            self.ready.set()
+            while True:
+                readable, _, _ = select.select([fd], [], [], min(self.debounce, 0.1))
+                if not readable:
+                    yield set()
+                    continue
+                changed = set()
+                data = os.read(fd, 65536)
+                offset = 0
+                while offset < len(data):
+                    wd, mask, _, length = INOTIFY_EVENT.unpack_from(data, offset)
+                    start = offset + INOTIFY_EVENT.size
+                    offset = start + length
+                    name = data[start:offset]
+                    if mask & IN_Q_OVERFLOW:
+                        # Events were lost, so rescan everything.
+                        changed |= {
+                            os.path.join(root, fn)
+                            for root, fn in ScanScan.walk(self.dir)
+                        }
+                        continue
+                    if wd not in watches:
+                        continue
+                    path = os.path.join(watches[wd], os.fsdecode(name.rstrip(b"\0")))
+                    if mask & IN_ISDIR:
+                        if mask & (IN_CREATE | IN_MOVED_TO):
+                            changed |= watch(path)
+                    elif mask & (IN_CLOSE_WRITE | IN_MOVED_TO):
+                        changed.add(path)
+                yield changed
+        finally:
+            os.close(fd)
+
+    @staticmethod
+    def scan(dir):
+        """Return the path to the (mtime, size) of all files in the directory."""
+        found = {}
+        with os.scandir(dir) as it:
+            for entry in it:
+                if entry.is_dir(follow_symlinks=False):
+                    found.update(ScanScanWatch.scan(entry.path))
+                elif entry.is_file():
+                    st = entry.stat()
+                    found[entry.path] = (st.st_mtime_ns, st.st_size)
+        return found
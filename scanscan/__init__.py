@@ -20,8 +20,13 @@
 # limitations under the License.
 """Utility module for searching and replacing across files."""
 
+import io
 import os
 import re
+import shutil
+import subprocess
+import tempfile
+from collections import OrderedDict
 from typing import Pattern
 
 """Utility for finding, searching and replacing in files."""
@@ -34,34 +39,231 @@ class ScanScan(object):
     # A regex for finding the first non numeric (version) tag in a file.
     fetch_tag: Pattern[str] = re.compile(r"^(.*?)([.-]\d+[.-]\d+[.-])")
 
+    # The same as fetch_tag, but matching every line in a block of filenames.
+    # The tag is consumed in runs up to each separator that doesn't start a
+    # version, which is much faster than a lazy match.
+    fetch_tags: Pattern[str] = re.compile(
+        r"^([^.\n-]*(?:[.-](?!\d+[.-]\d+[.-])[^.\n-]*)*)[^\n]*$", re.MULTILINE
+    )
+
+    # The maximum number of filenames to remember in ScanScan.get_tags.
+    tag_cache_size: int = 65536
+
+    # The most recently used filenames to their tag.
+    __tag_cache: "OrderedDict[str, str]" = OrderedDict()
+
+    # The number of bytes read at the start of a file to check if it's binary.
+    binary_header_size: int = 8000
+
     @staticmethod
     def apply_recursive(
-        dir, content_lambda, file_lambda=None, die_on_not_applied=False
+        dir,
+        content_lambda,
+        file_lambda=None,
+        die_on_not_applied=False,
+        cache=None,
+        encoding=None,
+        binary=False,
+        skip_binary=False,
+        files=None,
     ):
         """Scan a given directory to rewrite file content.
 
+        The same file is only ever processed once, even if it is found more
+        than once through hard links or symbolic links.
+
         Keyword arguments:
         dir -- the directory to recursively seach
         content_lambda -- a function to apply on the text of a file, returning
             the new text.
         file_lambda -- optional, a function to apply on the path and filename
             returning true if the file should be processed.
+        cache -- optional, a ScanScanCache to reuse the results for files with
+            identical content.
+        encoding -- optional, the encoding of the text files.  By default, the
+            platform encoding is used.
+        binary -- optional, if true the files are not decoded and the
+            content_lambda is applied on bytes, such as
+            ScanScan.content_replace(rb"search", rb"replace").
+        skip_binary -- optional, if true the files that look binary are
+            skipped (see ScanScan.is_binary).
+        files -- optional, the paths relative to the directory to process
+            instead of walking it, such as the ones returned by
+            ScanScan.git_files.
+        """
+        seen = set()
+        for root, fn in ScanScan.walk(dir, file_lambda, files):
+            st = os.stat(os.path.join(root, fn))
+            if (st.st_dev, st.st_ino) in seen:
+                continue
+            seen.add((st.st_dev, st.st_ino))
+            ScanScan.apply_file(
+                root,
+                fn,
+                content_lambda,
+                die_on_not_applied,
+                cache=cache,
+                encoding=encoding,
+                binary=binary,
+                skip_binary=skip_binary,
+            )
+
+    @staticmethod
+    def walk(dir, file_lambda=None, files=None):
+        """Generate the (root, filename) of every file to process in a directory.
+
+        Keyword arguments:
+        dir -- the directory to recursively seach
+        file_lambda -- optional, a function to apply on the path and filename
+            returning true if the file should be processed.
+        files -- optional, the paths relative to the directory to process
+            instead of walking it.  Any that aren't existing files are skipped.
         """
+        from scanscan.ScanScanFilter import ScanScanFilter
+
+        # Call a compiled ScanScanFilter directly.
+        file_lambda = ScanScanFilter.unwrap(file_lambda)
+        if files is not None:
+            for path in files:
+                root, fn = os.path.split(os.path.join(dir, path))
+                if not os.path.isfile(os.path.join(root, fn)):
+                    continue
+                if file_lambda is not None and not file_lambda(root, fn):
+                    continue
+                yield root, fn
+            return
         for root, dirs, files in os.walk(dir):
             for fn in files:
                 if file_lambda is not None and not file_lambda(root, fn):
                     continue
-                # logging:
-                # print(fn)
-                content = None
-                with open(os.path.join(root, fn), "r") as content_file:
-                    content = content_file.read()
-                content = content_lambda(content)
-                if content:
-                    with open(os.path.join(root, fn), "w") as content_file:
-                        content_file.write(content)
-                elif die_on_not_applied:
-                    raise Exception("Not applied on %s" % fn)
+                yield root, fn
+
+    @staticmethod
+    def apply_file(
+        root,
+        fn,
+        content_lambda,
+        die_on_not_applied=False,
+        cache=None,
+        encoding=None,
+        binary=False,
+        skip_binary=False,
+        atomic=False,
+    ):
+        """Rewrite the content of a single file.
+
+        Keyword arguments:
+        root -- the directory containing the file.
+        fn -- the name of the file.
+        content_lambda -- a function to apply on the text of a file, returning
+            the new text.
+        cache -- optional, a ScanScanCache to reuse the results for files with
+            identical content.
+        encoding -- optional, the encoding of the text file.
+        binary -- optional, if true the content_lambda is applied on bytes.
+        skip_binary -- optional, if true the file is skipped if it looks binary.
+        atomic -- optional, if true the new content is written to a temporary
+            file beside the file, then renamed over it, so the file is never
+            left partly written.  Symbolic links are followed, but any other
+            hard links keep the original content.
+
+        Returns true if the file was rewritten.
+        """
+        # logging:
+        # print(fn)
+        content = None
+        with open(os.path.join(root, fn), "rb") as content_file:
+            if skip_binary and ScanScan.is_binary_header(
+                content_file.read(ScanScan.binary_header_size)
+            ):
+                return False
+            content_file.seek(0)
+            if binary:
+                content = content_file.read()
+            else:
+                # Closing the wrapper also closes the file.
+                with io.TextIOWrapper(content_file, encoding=encoding) as text:
+                    content = text.read()
+        if cache is None:
+            content = content_lambda(content)
+        else:
+            content = cache.apply(content_lambda, content)
+        if content:
+            if atomic:
+                ScanScan.__replace_file(
+                    os.path.join(root, fn), content, encoding, binary
+                )
+            elif binary:
+                with open(os.path.join(root, fn), "wb") as content_file:
+                    content_file.write(content)
+            else:
+                with open(
+                    os.path.join(root, fn), "w", encoding=encoding
+                ) as content_file:
+                    content_file.write(content)
+            return True
+        elif die_on_not_applied:
+            raise Exception("Not applied on %s" % fn)
+        return False
+
+    @staticmethod
+    def __replace_file(filename, content, encoding, binary):
+        """Write the content to a temporary file and rename it over the file."""
+        target = os.path.realpath(filename)
+        dir, fn = os.path.split(target)
+        fd, tmp = tempfile.mkstemp(prefix=".%s." % fn, suffix=".tmp", dir=dir)
+        try:
+            if binary:
+                with open(fd, "wb") as content_file:
+                    content_file.write(content)
+            else:
+                with open(fd, "w", encoding=encoding) as content_file:
+                    content_file.write(content)
+            shutil.copymode(target, tmp)
+            os.replace(tmp, target)
+        except BaseException:
+            if os.path.exists(tmp):
+                os.remove(tmp)
+            raise
+
+    @staticmethod
+    def git_files(dir, ref=None):
+        """Return the paths relative to the directory of files known to git.
+
+        Keyword arguments:
+        dir -- a directory inside a git working copy.
+        ref -- optional, if present only the files that differ between the
+            ref and the working copy are returned.  Otherwise, all of the files
+            in the index are returned.
+        """
+        if ref is None:
+            cmd = ["git", "-C", str(dir), "ls-files", "-z"]
+        else:
+            cmd = ["git", "-C", str(dir), "diff", "--name-only", "--relative"]
+            cmd += ["--diff-filter=d", "-z", ref, "--"]
+        result = subprocess.run(cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+        if result.returncode != 0:
+            raise ScanScanError(result.stderr.decode(errors="replace").strip())
+        return [path for path in os.fsdecode(result.stdout).split("\0") if path]
+
+    @staticmethod
+    def is_binary(filename):
+        """Return true if the file looks like it contains binary data.
+
+        Only the first few kilobytes of the file are read.
+        """
+        with open(filename, "rb") as content_file:
+            return ScanScan.is_binary_header(
+                content_file.read(ScanScan.binary_header_size)
+            )
+
+    @staticmethod
+    def is_binary_header(header):
+        """Return true if the first bytes of a file look like binary data.
+
+        Like git, any file with a NUL byte in the header is considered binary.
+        """
+        return b"\0" in header
 
     @staticmethod
     def get_tag(filename):
@@ -80,6 +282,70 @@ class ScanScan(object):
         match = ScanScan.fetch_tag.search(filename)
         return filename if match is None else match.group(1)
 
+    @staticmethod
+    def get_tags(filenames):
+        """Return the list of tags for all of the filenames.
+
+        This is the same as calling ScanScan.get_tag on each filename, but
+        the most recently used tags are remembered, and the others are found
+        together in one regex scan.
+        """
+        filenames = list(filenames)
+        cache = ScanScan.__tag_cache
+        tags = list(map(cache.get, filenames))
+        misses = tags.count(None)
+        if misses == 0:
+            for filename in filenames:
+                cache.move_to_end(filename)
+            return tags
+
+        if misses == len(filenames):
+            missing = None
+            names = filenames
+        else:
+            missing = [i for i, tag in enumerate(tags) if tag is None]
+            names = [filenames[i] for i in missing]
+            for filename, tag in zip(filenames, tags):
+                if tag is not None:
+                    cache.move_to_end(filename)
+
+        block = "\n".join(names)
+        if block.count("\n") == len(names) - 1:
+            found = ScanScan.fetch_tags.findall(block)
+        else:
+            # Some filenames contain a newline and can't be scanned together.
+            found = [ScanScan.get_tag(filename) for filename in names]
+
+        if missing is None:
+            tags = found
+        else:
+            for i, tag in zip(missing, found):
+                tags[i] = tag
+
+        # Only the most recent filenames would stay in the cache.
+        size = ScanScan.tag_cache_size
+        cache.update(zip(names[-size:], found[-size:]))
+        while len(cache) > size:
+            cache.popitem(last=False)
+        return tags
+
+    @staticmethod
+    def get_version(filename):
+        """Return the 'version' portion of the filename (after the tag).
+
+        This is the remainder of the filename after the tag and its separator,
+        or None if the filename has no version.
+
+        xyz-0.1.2.jar => 0.1.2.jar
+        xyz.0.1.2-test.jar => 0.1.2-test.jar
+        xyz0.jar => None
+        """
+        match = ScanScan.fetch_tag.search(filename)
+        if match is None:
+            return None
+        start = match.start(2) + 1
+        return filename[start:]
+
     @staticmethod
     def content_test_and_add_next(test, to_add):
         """Return a lambda that checks if a "test" line exists before adding.
@@ -90,8 +356,8 @@ class ScanScan(object):
         """
 
         def content_test_and_add_next_method(input):
-            test_pattern = (
-                r"(?P<test>(?P<space>[ \t]*)%s\s*?)\n" r"((?P<next>.*)\n)?" % test
+            test_pattern = ScanScan.format_pattern(
+                r"(?P<test>(?P<space>[ \t]*)%s\s*?)\n" r"((?P<next>.*)\n)?", test
             )
             match = re.search(test_pattern, input)
             if not match:
@@ -101,7 +367,8 @@ class ScanScan(object):
             desired_next_line = re.sub(test, to_add, test_line)
             if actual_next_line == desired_next_line:
                 return None
-            dupl_pattern = "%s\n%s\n%s\n" % (
+            dupl_pattern = ScanScan.format_pattern(
+                "%s\n%s\n%s\n",
                 test_line,
                 desired_next_line,
                 actual_next_line,
@@ -120,8 +387,8 @@ class ScanScan(object):
         """
 
         def content_test_and_add_prev_method(input):
-            test_pattern = (
-                r"((?P<prev>.*)\n)?" r"(?P<test>(?P<space>[ \t]*)%s\s*?)\n" % test
+            test_pattern = ScanScan.format_pattern(
+                r"((?P<prev>.*)\n)?" r"(?P<test>(?P<space>[ \t]*)%s\s*?)\n", test
             )
             match = re.search(test_pattern, input)
             if not match:
@@ -131,7 +398,8 @@ class ScanScan(object):
             desired_prev_line = re.sub(test, to_add, test_line)
             if actual_prev_line == desired_prev_line:
                 return None
-            dupl_pattern = "%s\n%s\n%s\n" % (
+            dupl_pattern = ScanScan.format_pattern(
+                "%s\n%s\n%s\n",
                 actual_prev_line,
                 desired_prev_line,
                 test_line,
@@ -140,9 +408,30 @@ class ScanScan(object):
 
         return content_test_and_add_prev_method
 
+    @staticmethod
+    def format_pattern(template, *args):
+        """Return the str template formatted with the str or bytes arguments.
+
+        If any argument is bytes, the result is bytes, so the same rule can
+        build patterns for text and binary content.  The bytes are mapped one
+        to one through latin-1, and the template must be ASCII.
+        """
+        if not any(isinstance(arg, bytes) for arg in args):
+            return template % args
+        return (
+            template
+            % tuple(
+                arg.decode("latin-1") if isinstance(arg, bytes) else arg for arg in args
+            )
+        ).encode("latin-1")
+
     @staticmethod
     def content_replace(search, replace):
-        """Simple re search and replace."""
+        """Simple re search and replace.
+
+        Like all of the content lambdas, the search and replace arguments can
+        be bytes to rewrite binary content (see ScanScan.apply_file).
+        """
         return lambda input: re.sub(search, replace, input)
 
     @staticmethod
@@ -159,36 +448,50 @@ class ScanScan(object):
         """
 
         def content_replace_xml_by_comment_delimiter_method(input):
-            match = re.compile(
-                r"""(?P<comment>\n[ \t]*<!--\s*%s\s*-->)
+            delimiter = comment
+            if isinstance(comment, bytes):
+                delimiter = comment.decode("latin-1")
+            pattern = r"""(?P<comment>\n[ \t]*<!--\s*%s\s*-->)
                 (?P<to_replace>.*?)
                 (?P<next_comment>[^\n]*<!--)
-                """
-                % re.sub(r"\s+", r"\\s+", re.sub(r"\s", r"\s", comment)),
-                re.VERBOSE | re.MULTILINE | re.DOTALL,
+                """ % re.sub(r"\s+", r"\\s+", delimiter)
+            if isinstance(comment, bytes):
+                pattern = pattern.encode("latin-1")
+            match = re.compile(pattern, re.VERBOSE | re.MULTILINE | re.DOTALL)
+            return match.sub(
+                ScanScan.format_pattern(
+                    r"\g<comment>\n%s\g<next_comment>", replacement
+                ),
+                input,
             )
-            return match.sub(r"\g<comment>\n%s\g<next_comment>" % replacement, input)
 
         return content_replace_xml_by_comment_delimiter_method
 
     @staticmethod
     def file_endswith(extension, include=None, exclude=None):
-        """Return lambda that tests whether a filename matches an extension.
+        """Return a filter that tests whether a filename matches an extension.
+
+        The filter is a ScanScanFilter that can be combined with others.
 
         Keyword arguments:
         extension -- a string that must match the end of the file.
         include - optional, a string that must be present in the filename.
         exclude - optional, a string that must not be present in the filename.
         """
-        return (
-            lambda dir, filename: filename.endswith(extension)
-            and (include is None or include in filename)
-            and (exclude is None or exclude not in filename)
-        )
+        from scanscan.ScanScanFilter import Exclude, Extension, Include
+
+        f = Extension(extension)
+        if include is not None:
+            f &= Include(include)
+        if exclude is not None:
+            f &= Exclude(exclude)
+        return f
 
     @staticmethod
     def file_has_tag(tag, extension=None, include=None, exclude=None):
-        """Return lambda that tests whether a filename matches a tag.
+        """Return a filter that tests whether a filename matches a tag.
+
+        The filter is a ScanScanFilter that can be combined with others.
 
         Keyword arguments:
         tag -- the tag for the file (see ScanScan.get_tag).
@@ -196,12 +499,16 @@ class ScanScan(object):
         include - optional, a string that must be present in the filename.
         exclude - optional, a string that must not be present in the filename.
         """
-        return (
-            lambda dir, filename: tag == ScanScan.get_tag(filename)
-            and (extension is None or filename.endswith(extension))
-            and (include is None or include in filename)
-            and (exclude is None or exclude not in filename)
-        )
+        from scanscan.ScanScanFilter import Exclude, Extension, Include, Tag
+
+        f = Tag(tag)
+        if extension is not None:
+            f = Extension(extension) & f
+        if include is not None:
+            f &= Include(include)
+        if exclude is not None:
+            f &= Exclude(exclude)
+        return f
 
 
 class ScanScanError(Exception):
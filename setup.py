@@ -47,7 +47,7 @@ setup(
     author_email="ryan@skraba.com",
     license="ASL",
     packages=["scanscan"],
-    scripts=["bin/hello-world"],
+    scripts=["bin/hello-world", "bin/scanscan"],
     install_requires=[avro_install_requires, "docopt==0.6.2"],
     classifiers=[
         "Development Status :: 3 - Alpha",
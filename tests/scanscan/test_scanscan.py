@@ -0,0 +1,186 @@
+# -*- mode: python -*-
+# -*- coding: utf-8 -*-
+
+##
+# Licensed to the Apache Software Foundation (ASF) under one
+# or more contributor license agreements.  See the NOTICE file
+# distributed with this work for additional information
+# regarding copyright ownership.  The ASF licenses this file
+# to you under the Apache License, Version 2.0 (the
+# "License"); you may not use this file except in compliance
+# with the License.  You may obtain a copy of the License at
+#
+# https://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+
+import os
+import subprocess
+import tempfile
+import time
+import unittest
+from pathlib import Path
+
+from scanscan import ScanScan, ScanScanError
+
+
+class ScanScanTestSuite(unittest.TestCase):
+    """Basic test cases."""
+
+    def test_apply_recursive_encoding(self):
+        with tempfile.TemporaryDirectory() as tmp_dir_name:
+            dtmp = Path(tmp_dir_name)
+            with open(dtmp / "latin1.txt", "wb") as f:
+                f.write("Copyright © 2020\n".encode("latin-1"))
+            with open(dtmp / "image.png", "wb") as f:
+                f.write(b"\x89PNG\r\n\x1a\n\x00\x00\x00\rIHDR 2020")
+
+            ScanScan.apply_recursive(
+                tmp_dir_name,
+                ScanScan.content_replace("2020", "2023"),
+                encoding="latin-1",
+                skip_binary=True,
+            )
+
+            with open(dtmp / "latin1.txt", "rb") as f:
+                self.assertEqual("Copyright © 2023\n".encode("latin-1"), f.read())
+            with open(dtmp / "image.png", "rb") as f:
+                self.assertEqual(b"\x89PNG\r\n\x1a\n\x00\x00\x00\rIHDR 2020", f.read())
+
+    def test_apply_recursive_binary(self):
+        with tempfile.TemporaryDirectory() as tmp_dir_name:
+            dtmp = Path(tmp_dir_name)
+            with open(dtmp / "latin1.txt", "wb") as f:
+                f.write(b"Copyright \xa9 2020\r\n")
+            with open(dtmp / "image.png", "wb") as f:
+                f.write(b"\x89PNG\r\n\x1a\n\x00\x00\x00\rIHDR 2020")
+
+            ScanScan.apply_recursive(
+                tmp_dir_name, ScanScan.content_replace(rb"2020", rb"2023"), binary=True
+            )
+
+            # Neither the unknown encoding nor the line endings are changed.
+            with open(dtmp / "latin1.txt", "rb") as f:
+                self.assertEqual(b"Copyright \xa9 2023\r\n", f.read())
+            with open(dtmp / "image.png", "rb") as f:
+                self.assertEqual(b"\x89PNG\r\n\x1a\n\x00\x00\x00\rIHDR 2023", f.read())
+            self.assertTrue(ScanScan.is_binary(dtmp / "image.png"))
+            self.assertFalse(ScanScan.is_binary(dtmp / "latin1.txt"))
+
+    def test_content_lambdas_binary(self):
+        add_next = ScanScan.content_test_and_add_next(b"<a>\xa9</a>", b"<b>\xa9</b>")
+        self.assertEqual(
+            b"  <a>\xa9</a>\n  <b>\xa9</b>\nend\n",
+            add_next(b"  <a>\xa9</a>\nend\n"),
+        )
+        add_prev = ScanScan.content_test_and_add_prev(b"<a>\xa9</a>", b"<b>\xa9</b>")
+        self.assertEqual(
+            b"start\n  <b>\xa9</b>\n  <a>\xa9</a>\n",
+            add_prev(b"start\n  <a>\xa9</a>\n"),
+        )
+        by_comment = ScanScan.content_replace_xml_by_comment_delimiter(
+            b"start  here", b"  <new/>\n"
+        )
+        self.assertEqual(
+            b"<x>\n  <!-- start here -->\n  <new/>\n  <!-- end -->\n</x>\n",
+            by_comment(b"<x>\n  <!-- start here -->\n  <old/>\n  <!-- end -->\n</x>\n"),
+        )
+        # The same rules still work on text.
+        self.assertEqual(
+            "  <a>x</a>\n  <b>x</b>\nend\n",
+            ScanScan.content_test_and_add_next("<a>x</a>", "<b>x</b>")(
+                "  <a>x</a>\nend\n"
+            ),
+        )
+
+    def test_apply_recursive_git_files(self):
+        with tempfile.TemporaryDirectory() as tmp_dir_name:
+            dtmp = Path(tmp_dir_name)
+            os.mkdir(dtmp / "sub")
+            for fn in ("one.txt", "two.txt", os.path.join("sub", "three.txt")):
+                with open(dtmp / fn, "w") as f:
+                    f.write("2020\n")
+
+            def git(*args):
+                subprocess.run(
+                    ["git", "-C", tmp_dir_name, "-c", "user.name=test"]
+                    + ["-c", "user.email=test@example.com"]
+                    + list(args),
+                    check=True,
+                    stdout=subprocess.DEVNULL,
+                )
+
+            git("init", "-q")
+            git("add", ".")
+            git("commit", "-q", "-m", "Initial")
+            with open(dtmp / "sub" / "three.txt", "w") as f:
+                f.write("2020 changed\n")
+            os.remove(dtmp / "two.txt")
+
+            # Deleted files are still in the index, but are skipped in the walk.
+            self.assertEqual(
+                ["one.txt", "sub/three.txt", "two.txt"],
+                sorted(ScanScan.git_files(tmp_dir_name)),
+            )
+            self.assertEqual(["three.txt"], ScanScan.git_files(dtmp / "sub", "HEAD"))
+            with self.assertRaises(ScanScanError):
+                ScanScan.git_files(tmp_dir_name, "unknown-ref")
+
+            # Only the changed files are processed.
+            ScanScan.apply_recursive(
+                tmp_dir_name,
+                ScanScan.content_replace("2020", "2023"),
+                files=ScanScan.git_files(tmp_dir_name, "HEAD"),
+            )
+            with open(dtmp / "one.txt") as f:
+                self.assertEqual("2020\n", f.read())
+            with open(dtmp / "sub" / "three.txt") as f:
+                self.assertEqual("2023 changed\n", f.read())
+
+    def test_get_tags(self):
+        filenames = [
+            "xyz-0.1.2.jar",
+            "xyz.0.1.2-test.jar",
+            "xyz0.0.0.jar",
+            "xyz0.jar",
+            "",
+            "with\nnewline-1.2.3.jar",
+            "xyz-0.1.2.jar",
+        ]
+        expected = [ScanScan.get_tag(fn) for fn in filenames]
+        self.assertEqual(expected, ScanScan.get_tags(filenames))
+        self.assertEqual(expected, ScanScan.get_tags(iter(filenames)))
+        self.assertEqual([], ScanScan.get_tags([]))
+
+    @unittest.skipUnless(os.environ.get("BENCHMARK"), "Set BENCHMARK=1 to run")
+    def test_get_tags_benchmark(self):
+        filenames = [
+            "artifact%s-%s.%s.%s.jar" % (i % 1000, i % 7, i % 11, i)
+            for i in range(10**6)
+        ]
+        start = time.perf_counter()
+        expected = [ScanScan.get_tag(fn) for fn in filenames]
+        one_by_one = time.perf_counter() - start
+
+        start = time.perf_counter()
+        self.assertEqual(expected, ScanScan.get_tags(filenames))
+        cold = time.perf_counter() - start
+
+        size = ScanScan.tag_cache_size
+        start = time.perf_counter()
+        ScanScan.get_tags(filenames[-size:])
+        warm = time.perf_counter() - start
+
+        print(
+            "get_tag: %.3fs, get_tags: %.3fs, get_tags (%s cached): %.3fs"
+            % (one_by_one, cold, size, warm)
+        )
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,93 @@
+# -*- mode: python -*-
+# -*- coding: utf-8 -*-
+
+##
+# Licensed to the Apache Software Foundation (ASF) under one
+# or more contributor license agreements.  See the NOTICE file
+# distributed with this work for additional information
+# regarding copyright ownership.  The ASF licenses this file
+# to you under the Apache License, Version 2.0 (the
+# "License"); you may not use this file except in compliance
+# with the License.  You may obtain a copy of the License at
+#
+# https://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import os
+import tempfile
+import unittest
+from pathlib import Path
+
+from scanscan.ScanScanArtifacts import ScanScanArtifacts
+
+
+class ScanScanArtifactsTestSuite(unittest.TestCase):
+    """Basic test cases."""
+
+    def test_parse_version(self):
+        self.assertEqual(
+            ((1, 10, 2), True, ""), ScanScanArtifacts.parse_version("1.10.2.jar")
+        )
+        self.assertEqual(
+            ((1, 11, 0), False, "-SNAPSHOT"),
+            ScanScanArtifacts.parse_version("1.11.0-SNAPSHOT.tar.gz"),
+        )
+        self.assertLess(
+            ScanScanArtifacts.parse_version("1.9.2.jar"),
+            ScanScanArtifacts.parse_version("1.10.0-SNAPSHOT.jar"),
+        )
+        self.assertLess(
+            ScanScanArtifacts.parse_version("1.10.0-SNAPSHOT.jar"),
+            ScanScanArtifacts.parse_version("1.10.0.jar"),
+        )
+
+    def test_basic(self):
+        with tempfile.TemporaryDirectory() as tmp_dir_name:
+            dtmp = Path(tmp_dir_name)
+            os.mkdir(dtmp / "lib")
+            for fn in (
+                "avro-1.9.2.jar",
+                "avro-1.10.2.jar",
+                "avro-1.11.1.jar",
+                "avro-1.11.1-tests.jar",
+                "jackson-core-2.14.1.jar",
+                "README",
+            ):
+                (dtmp / "lib" / fn).touch()
+
+            artifacts = ScanScanArtifacts(tmp_dir_name)
+            self.assertEqual(
+                {
+                    "avro": (str(dtmp / "lib" / "avro-1.11.1.jar"), "1.11.1.jar"),
+                    "jackson-core": (
+                        str(dtmp / "lib" / "jackson-core-2.14.1.jar"),
+                        "2.14.1.jar",
+                    ),
+                },
+                artifacts.latest(),
+            )
+            self.assertEqual(["avro"], list(artifacts.duplicates()))
+            self.assertEqual(4, len(artifacts.duplicates()["avro"]))
+            self.assertEqual(
+                [str(dtmp / "lib" / "avro-1.9.2.jar")], artifacts.older_than(2)
+            )
+            self.assertEqual(
+                [
+                    str(dtmp / "lib" / "avro-1.10.2.jar"),
+                    str(dtmp / "lib" / "avro-1.9.2.jar"),
+                ],
+                artifacts.older_than(1),
+            )
+            self.assertEqual(
+                ["1.9.2.jar", "1.10.2.jar", "1.11.1-tests.jar", "1.11.1.jar"],
+                [version for _, version in artifacts.versions()["avro"]],
+            )
+
+
+if __name__ == "__main__":
+    unittest.main()
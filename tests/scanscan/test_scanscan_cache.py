@@ -0,0 +1,161 @@
+# -*- mode: python -*-
+# -*- coding: utf-8 -*-
+
+##
+# Licensed to the Apache Software Foundation (ASF) under one
+# or more contributor license agreements.  See the NOTICE file
+# distributed with this work for additional information
+# regarding copyright ownership.  The ASF licenses this file
+# to you under the Apache License, Version 2.0 (the
+# "License"); you may not use this file except in compliance
+# with the License.  You may obtain a copy of the License at
+#
+# https://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import os
+import re
+import tempfile
+import unittest
+from pathlib import Path
+
+from scanscan import ScanScan
+from scanscan.ScanScanCache import ScanScanCache
+
+
+def increment(content):
+    """Update the copyright year, or increment a counter."""
+    if content.startswith("Copyright"):
+        return content.replace("2020", "2023")
+    return str(int(content) + 1)
+
+
+class Suffix(object):
+    """A callable object with some state."""
+
+    def __init__(self, suffix):
+        self.suffix = suffix
+
+    def __call__(self, content):
+        return content + self.suffix
+
+    def apply(self, content):
+        return content + self.suffix
+
+
+class NoState(object):
+    """A callable object whose state can't be inspected."""
+
+    __slots__ = ()
+
+    def __call__(self, content):
+        return content
+
+
+class ScanScanCacheTestSuite(unittest.TestCase):
+    """Basic test cases."""
+
+    def test_fingerprint(self):
+        self.assertEqual(
+            ScanScanCache.fingerprint(ScanScan.content_replace("a", "b")),
+            ScanScanCache.fingerprint(ScanScan.content_replace("a", "b")),
+        )
+        self.assertNotEqual(
+            ScanScanCache.fingerprint(ScanScan.content_replace("a", "b")),
+            ScanScanCache.fingerprint(ScanScan.content_replace("a", "c")),
+        )
+        self.assertNotEqual(
+            ScanScanCache.fingerprint(lambda c: c.upper()),
+            ScanScanCache.fingerprint(lambda c: c.lower()),
+        )
+
+    def test_fingerprint_values(self):
+        # Bound methods include the state of their instance.
+        self.assertNotEqual(
+            ScanScanCache.fingerprint(Suffix("1").apply),
+            ScanScanCache.fingerprint(Suffix("2").apply),
+        )
+        self.assertEqual(
+            ScanScanCache.fingerprint(Suffix("1")),
+            ScanScanCache.fingerprint(Suffix("1")),
+        )
+        # Long regexes are compared in full.
+        long = "a" * 300
+        self.assertNotEqual(
+            ScanScanCache.fingerprint(ScanScan.content_replace(re.compile(long), "")),
+            ScanScanCache.fingerprint(
+                ScanScan.content_replace(re.compile(long + "b"), "")
+            ),
+        )
+
+        # Objects that can't be described aren't cached.
+        no_state = NoState()
+        self.assertIsNone(ScanScanCache.fingerprint(no_state))
+        cache = ScanScanCache()
+        self.assertEqual("x", cache.apply(no_state, "x"))
+        self.assertEqual("x", cache.apply(no_state, "x"))
+        self.assertEqual(2, cache.misses)
+        self.assertEqual({}, cache.results)
+
+    def test_fingerprint_recursive(self):
+        def outer():
+            def countdown(n):
+                return n if n <= 0 else countdown(n - 1)
+
+            return countdown
+
+        self.assertIn("<recursive", ScanScanCache.fingerprint(outer()))
+
+        def unassigned():
+            def inner(content):
+                return later(content)
+
+            fingerprint = ScanScanCache.fingerprint(inner)
+            later = str.upper
+            return fingerprint
+
+        self.assertIn("<empty>", unassigned())
+
+    def test_apply_recursive(self):
+        with tempfile.TemporaryDirectory() as tmp_dir_name:
+            dtmp = Path(tmp_dir_name)
+            for i in range(5):
+                with open(dtmp / ("copy%s.txt" % i), "w") as f:
+                    f.write("Copyright 2020\n")
+            with open(dtmp / "other.txt", "w") as f:
+                f.write("Copyright 2021\n")
+            # The same file through a hard link and a symbolic link.
+            with open(dtmp / "counter.txt", "w") as f:
+                f.write("0")
+            os.link(dtmp / "counter.txt", dtmp / "hardlink.txt")
+            os.symlink(dtmp / "counter.txt", dtmp / "symlink.txt")
+
+            cache_file = str(dtmp / "cache.pickle")
+            cache = ScanScanCache(cache_file)
+            ScanScan.apply_recursive(tmp_dir_name, increment, cache=cache)
+            cache.save()
+
+            self.assertEqual(3, cache.misses)
+            self.assertEqual(4, cache.hits)
+            for i in range(5):
+                with open(dtmp / ("copy%s.txt" % i)) as f:
+                    self.assertEqual("Copyright 2023\n", f.read())
+            with open(dtmp / "symlink.txt") as f:
+                self.assertEqual("1", f.read())
+
+            # The persisted results are reused without calling the function.
+            cache = ScanScanCache(cache_file)
+            self.assertEqual(
+                "Copyright 2023\n", cache.apply(increment, "Copyright 2020\n")
+            )
+            self.assertEqual(0, cache.misses)
+            self.assertEqual(1, cache.hits)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,149 @@
+# -*- mode: python -*-
+# -*- coding: utf-8 -*-
+
+##
+# Licensed to the Apache Software Foundation (ASF) under one
+# or more contributor license agreements.  See the NOTICE file
+# distributed with this work for additional information
+# regarding copyright ownership.  The ASF licenses this file
+# to you under the Apache License, Version 2.0 (the
+# "License"); you may not use this file except in compliance
+# with the License.  You may obtain a copy of the License at
+#
+# https://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+
+import tempfile
+import unittest
+from pathlib import Path
+
+from scanscan import ScanScan
+from scanscan.ScanScanFile import ScanScanFile
+
+
+class ScanScanFileTestSuite(unittest.TestCase):
+    """Basic test cases."""
+
+    def test_basic(self):
+        with tempfile.TemporaryDirectory() as tmp_dir_name:
+            dtmp = Path(tmp_dir_name)
+            with open(dtmp / "pom.xml", "w", encoding="utf-8") as f:
+                f.write(
+                    "<project>\n  <!-- Versión -->\n  <version>1</version>\n</project>\n"
+                )
+
+            ssf = ScanScanFile(dtmp / "pom.xml", encoding="utf-8")
+            self.assertTrue(ssf.contains_xml_comment("Versión"))
+            ssf.apply(ScanScan.content_replace(r"1<", r"2<")).write()
+            with open(dtmp / "pom.xml", encoding="utf-8") as f:
+                self.assertIn("<version>2</version>", f.read())
+
+            with self.assertRaises(Exception):
+                ssf.apply(lambda c: None, die_on_not_applied=True)
+
+    def test_lazy(self):
+        with tempfile.TemporaryDirectory() as tmp_dir_name:
+            dtmp = Path(tmp_dir_name)
+
+            # Nothing is read until the content is used.
+            ssf = ScanScanFile(dtmp / "pom.xml")
+            with open(dtmp / "pom.xml", "w") as f:
+                f.write("<project>\n  <!-- Version -->\n</project>\n")
+            self.assertTrue(ssf.contains_xml_comment("Version"))
+            self.assertFalse(ssf.contains_xml_comment("Missing"))
+            self.assertFalse(ssf.dirty)
+
+            # Unmodified files are never written, even after being read.
+            ssf.apply(ScanScan.content_replace("Missing", "Other"))
+            self.assertFalse(ssf.dirty)
+            with open(dtmp / "pom.xml", "w") as f:
+                f.write("Modified elsewhere")
+            ssf.write()
+            with open(dtmp / "pom.xml") as f:
+                self.assertEqual("Modified elsewhere", f.read())
+
+            ssf.apply(ScanScan.content_replace("Version", "Other"))
+            self.assertTrue(ssf.dirty)
+            ssf.write()
+            self.assertFalse(ssf.dirty)
+            with open(dtmp / "pom.xml") as f:
+                self.assertEqual("<project>\n  <!-- Other -->\n</project>\n", f.read())
+
+            (dtmp / "empty.xml").touch()
+            self.assertFalse(ScanScanFile(dtmp / "empty.xml").contains_xml_comment("x"))
+
+    def test_utf16(self):
+        with tempfile.TemporaryDirectory() as tmp_dir_name:
+            dtmp = Path(tmp_dir_name)
+            with open(dtmp / "pom.xml", "w", encoding="utf-16") as f:
+                f.write("<project>\n  <!-- Versión -->\n</project>\n")
+
+            # The file can't be searched as bytes, so it is loaded instead.
+            self.assertTrue(
+                ScanScanFile(dtmp / "pom.xml", encoding="utf-16").contains_xml_comment(
+                    "Versión"
+                )
+            )
+
+    def test_binary(self):
+        with tempfile.TemporaryDirectory() as tmp_dir_name:
+            dtmp = Path(tmp_dir_name)
+            with open(dtmp / "pom.xml", "wb") as f:
+                f.write(
+                    b"<project>\r\n  <!-- Versi\xf3n -->\r\n  <version>1</version>\r\n"
+                )
+
+            ssf = ScanScanFile(dtmp / "pom.xml", encoding="latin-1", binary=True)
+            self.assertTrue(ssf.contains_xml_comment("Versión"))
+            self.assertTrue(ssf.contains_xml_comment(b"Versi\xf3n"))
+            self.assertFalse(ssf.contains_xml_comment(b"Version"))
+            ssf.apply(ScanScan.content_replace(rb"1<", rb"2<")).write()
+            with open(dtmp / "pom.xml", "rb") as f:
+                self.assertEqual(
+                    b"<project>\r\n  <!-- Versi\xf3n -->\r\n  <version>2</version>\r\n",
+                    f.read(),
+                )
+
+    def test_pieces(self):
+        with tempfile.TemporaryDirectory() as tmp_dir_name:
+            dtmp = Path(tmp_dir_name)
+            with open(dtmp / "list.txt", "w") as f:
+                f.write("".join("line %s\n" % i for i in range(1000)))
+
+            plain = ScanScanFile(dtmp / "list.txt")
+            pieces = ScanScanFile(dtmp / "list.txt", pieces=True)
+            for ssf in (plain, pieces):
+                for i in range(0, 1000, 10):
+                    ssf.insert_after_line(r"line %s$" % i, "after %s" % i)
+                ssf.insert(0, "first\n")
+                ssf.insert_after_line("missing", "never")
+                with self.assertRaises(Exception):
+                    ssf.insert_after_line("missing", "never", die_on_not_applied=True)
+            self.assertEqual(plain.content, pieces.content)
+            self.assertTrue(
+                pieces.content.startswith("first\nline 0\nafter 0\nline 1\n")
+            )
+
+            # The content can still be transformed after splicing.
+            pieces.apply(ScanScan.content_replace("first", "start"))
+            pieces.insert_after_line("line 999", "last").write()
+            with open(dtmp / "list.txt") as f:
+                content = f.read()
+            self.assertTrue(content.startswith("start\n"))
+            self.assertTrue(content.endswith("line 999\nlast\n"))
+
+            # The line and its test can be bytes in a binary file.
+            for use_pieces in (False, True):
+                binary = ScanScanFile(dtmp / "list.txt", binary=True, pieces=use_pieces)
+                binary.insert_after_line(b"line 5$", b"after \xff")
+                self.assertIn(b"line 5\nafter \xff\nline 6\n", binary.content)
+
+
+if __name__ == "__main__":
+    unittest.main()
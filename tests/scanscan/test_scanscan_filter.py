@@ -0,0 +1,144 @@
+# -*- mode: python -*-
+# -*- coding: utf-8 -*-
+
+##
+# Licensed to the Apache Software Foundation (ASF) under one
+# or more contributor license agreements.  See the NOTICE file
+# distributed with this work for additional information
+# regarding copyright ownership.  The ASF licenses this file
+# to you under the Apache License, Version 2.0 (the
+# "License"); you may not use this file except in compliance
+# with the License.  You may obtain a copy of the License at
+#
+# https://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import os
+import pickle
+import tempfile
+import time
+import unittest
+from pathlib import Path
+
+from scanscan import ScanScan
+from scanscan.ScanScanFilter import (
+    And,
+    Exclude,
+    Extension,
+    Glob,
+    Include,
+    Mtime,
+    Or,
+    Size,
+    Tag,
+)
+
+
+class ScanScanFilterTestSuite(unittest.TestCase):
+    """Basic test cases."""
+
+    def test_file_endswith(self):
+        f = ScanScan.file_endswith(".xml", include="pom", exclude="test")
+        self.assertTrue(f("dir", "pom.xml"))
+        self.assertTrue(f("dir", "my-pom.xml"))
+        self.assertFalse(f("dir", "pom.json"))
+        self.assertFalse(f("dir", "build.xml"))
+        self.assertFalse(f("dir", "test-pom.xml"))
+
+    def test_file_has_tag(self):
+        f = ScanScan.file_has_tag("avro", extension=".jar", exclude="tests")
+        self.assertTrue(f("lib", "avro-1.11.1.jar"))
+        self.assertFalse(f("lib", "avro-1.11.1-tests.jar"))
+        self.assertFalse(f("lib", "avro-1.11.1.tar.gz"))
+        self.assertFalse(f("lib", "avro-tools-1.11.1.jar"))
+
+    def test_algebra(self):
+        f = (Extension(".xml") | Extension(".pom") | Glob("build.*")) & ~Include("test")
+        self.assertTrue(f("dir", "pom.xml"))
+        self.assertTrue(f("dir", "x.pom"))
+        self.assertTrue(f("dir", "build.gradle"))
+        self.assertFalse(f("dir", "test.xml"))
+        self.assertFalse(f("dir", "pom.json"))
+        self.assertTrue(And()("dir", "anything"))
+        self.assertFalse(Or()("dir", "anything"))
+        self.assertTrue((Tag("avro") | Exclude("a"))("dir", "avro-1.2.3.jar"))
+
+        # The filter can be sent to another process.
+        copy = pickle.loads(pickle.dumps(f))
+        self.assertEqual(repr(f), repr(copy))
+        self.assertTrue(copy("dir", "pom.xml"))
+        self.assertFalse(copy("dir", "test.xml"))
+
+    def test_stat(self):
+        with tempfile.TemporaryDirectory() as tmp_dir_name:
+            dtmp = Path(tmp_dir_name)
+            with open(dtmp / "small.txt", "w") as f:
+                f.write("x")
+            with open(dtmp / "large.txt", "w") as f:
+                f.write("x" * 1000)
+            old = time.time() - 3600
+            os.utime(dtmp / "large.txt", (old, old))
+
+            self.assertTrue(Size(max=10)(tmp_dir_name, "small.txt"))
+            self.assertFalse(Size(max=10)(tmp_dir_name, "large.txt"))
+            self.assertTrue(Size(100, 1000)(tmp_dir_name, "large.txt"))
+            self.assertTrue(Mtime(after=old + 60)(tmp_dir_name, "small.txt"))
+            self.assertFalse(Mtime(after=old + 60)(tmp_dir_name, "large.txt"))
+            self.assertEqual(
+                ["large.txt"],
+                [
+                    fn
+                    for _, fn in ScanScan.walk(
+                        tmp_dir_name, Extension(".txt") & Mtime(before=old + 60)
+                    )
+                ],
+            )
+
+            # The same filter sees a file change between two calls.
+            small = Size(max=5) & Mtime(after=old + 60)
+            self.assertTrue(small(tmp_dir_name, "small.txt"))
+            with open(dtmp / "small.txt", "w") as f:
+                f.write("x" * 100)
+            self.assertFalse(small(tmp_dir_name, "small.txt"))
+
+    @unittest.skipUnless(os.environ.get("BENCHMARK"), "Set BENCHMARK=1 to run")
+    def test_filter_benchmark(self):
+        filenames = [
+            "file%s%s" % (i, ext)
+            for i in range(10**5)
+            for ext in (".xml", ".txt", ".java", ".py")
+        ]
+        extensions = (".xml", ".java", ".py")
+
+        def lambda_endswith(extension, exclude):
+            # The filter as it was written before ScanScanFilter.
+            return lambda dir, filename: filename.endswith(extension) and (
+                exclude is None or exclude not in filename
+            )
+
+        lambdas = [lambda_endswith(e, "test") for e in extensions]
+        f = Or(*[Extension(e) for e in extensions]) & Exclude("test")
+        matcher = f.matcher()
+
+        timings = []
+        for name, check, expected in (
+            ("lambda", lambda_endswith(".xml", "test"), 10**5),
+            ("file_endswith", ScanScan.file_endswith(".xml", exclude="test"), 10**5),
+            ("lambdas", lambda dir, fn: any(m(dir, fn) for m in lambdas), 3 * 10**5),
+            ("filter", f, 3 * 10**5),
+            ("matcher", matcher, 3 * 10**5),
+        ):
+            start = time.perf_counter()
+            matched = sum(1 for fn in filenames if check("dir", fn))
+            timings.append("%s: %.3fs" % (name, time.perf_counter() - start))
+            self.assertEqual(expected, matched)
+        print(", ".join(timings))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,107 @@
+# -*- mode: python -*-
+# -*- coding: utf-8 -*-
+
+##
+# Licensed to the Apache Software Foundation (ASF) under one
+# or more contributor license agreements.  See the NOTICE file
+# distributed with this work for additional information
+# regarding copyright ownership.  The ASF licenses this file
+# to you under the Apache License, Version 2.0 (the
+# "License"); you may not use this file except in compliance
+# with the License.  You may obtain a copy of the License at
+#
+# https://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import os
+import tempfile
+import unittest
+from pathlib import Path
+
+from scanscan import ScanScan
+from scanscan.ScanScanIndex import ScanScanIndex
+
+
+class ScanScanIndexTestSuite(unittest.TestCase):
+    """Basic test cases."""
+
+    def test_required_literals(self):
+        self.assertEqual(["abc"], ScanScanIndex.required_literals("abc"))
+        self.assertEqual(["ab", "cd"], ScanScanIndex.required_literals(r"ab\d+cd"))
+        self.assertEqual(["a.b"], ScanScanIndex.required_literals(r"a\.b"))
+        self.assertEqual([], ScanScanIndex.required_literals(r"(?i)abc"))
+        self.assertEqual([], ScanScanIndex.required_literals(r"abc|def"))
+        self.assertEqual([], ScanScanIndex.required_literals(r"[(unparseable"))
+
+    def test_basic(self):
+        with tempfile.TemporaryDirectory() as tmp_dir_name:
+            dtmp = Path(tmp_dir_name)
+            os.mkdir(dtmp / "sub")
+            with open(dtmp / "one.txt", "w") as f:
+                f.write("<version>1.0</version>\n")
+            with open(dtmp / "sub" / "two.txt", "w") as f:
+                f.write("<name>two</name>\n")
+            with open(dtmp / "binary.dat", "wb") as f:
+                f.write(b"\xff\xfe\x00")
+
+            index_file = str(dtmp / "scanscan.idx")
+            idx = ScanScanIndex(tmp_dir_name, index_file)
+            self.assertEqual(3, idx.update())
+            self.assertEqual(0, idx.update())
+            self.assertTrue(os.path.exists(index_file))
+
+            # Files that can't be read are always candidates.
+            self.assertEqual(["binary.dat", "one.txt"], idx.candidates("version"))
+            self.assertEqual(
+                ["binary.dat", os.path.join("sub", "two.txt")],
+                idx.candidates_regex(r"<name>\w+</name>"),
+            )
+            self.assertEqual(["binary.dat"], idx.candidates("missing"))
+
+            # The index is reloaded from disk and only refreshes modified files.
+            with open(dtmp / "sub" / "two.txt", "w") as f:
+                f.write("<version>2.0</version>\n")
+            idx = ScanScanIndex(tmp_dir_name, index_file)
+            self.assertEqual(3, len(idx.files))
+            self.assertEqual(1, idx.update())
+            self.assertEqual(
+                ["binary.dat", "one.txt", os.path.join("sub", "two.txt")],
+                idx.candidates("<version>"),
+            )
+
+            # Only the candidates are rewritten.
+            applied = idx.apply(
+                r"<name>", ScanScan.content_replace(r"<name>", r"<artifactId>")
+            )
+            self.assertEqual([], applied)
+            applied = idx.apply(
+                r"<version>2", ScanScan.content_replace(r"<version>2", r"<version>3")
+            )
+            self.assertEqual([os.path.join("sub", "two.txt")], applied)
+            with open(dtmp / "sub" / "two.txt") as f:
+                self.assertEqual("<version>3.0</version>\n", f.read())
+
+    def test_dangling_symlink(self):
+        with tempfile.TemporaryDirectory() as tmp_dir_name:
+            dtmp = Path(tmp_dir_name)
+            with open(dtmp / "one.txt", "w") as f:
+                f.write("<version>1.0</version>\n")
+            os.symlink(dtmp / "missing.txt", dtmp / "dangling.txt")
+
+            idx = ScanScanIndex(tmp_dir_name)
+            self.assertEqual(2, idx.update())
+            self.assertEqual(0, idx.update())
+            self.assertEqual(["dangling.txt", "one.txt"], idx.candidates("version"))
+            applied = idx.apply(
+                r"<version>1", ScanScan.content_replace(r"<version>1", r"<version>2")
+            )
+            self.assertEqual(["one.txt"], applied)
+
+
+if __name__ == "__main__":
+    unittest.main()
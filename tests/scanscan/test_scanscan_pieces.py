@@ -0,0 +1,56 @@
+# -*- mode: python -*-
+# -*- coding: utf-8 -*-
+
+##
+# Licensed to the Apache Software Foundation (ASF) under one
+# or more contributor license agreements.  See the NOTICE file
+# distributed with this work for additional information
+# regarding copyright ownership.  The ASF licenses this file
+# to you under the Apache License, Version 2.0 (the
+# "License"); you may not use this file except in compliance
+# with the License.  You may obtain a copy of the License at
+#
+# https://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import re
+import unittest
+
+from scanscan.ScanScanPieces import ScanScanPieces
+
+
+class ScanScanPiecesTestSuite(unittest.TestCase):
+    """Basic test cases."""
+
+    def test_basic(self):
+        pieces = ScanScanPieces("one\ntwo\nthree\n")
+        pieces.insert(4, "1.5\n").insert(0, "zero\n").insert(len(pieces), "four\n")
+        self.assertEqual("zero\none\n1.5\ntwo\nthree\nfour\n", str(pieces))
+        self.assertEqual(5, len(pieces.pieces))
+
+        pieces.delete(5, 13)
+        self.assertEqual("zero\ntwo\nthree\nfour\n", str(pieces))
+        self.assertEqual(len("zero\ntwo\nthree\nfour\n"), len(pieces))
+
+        self.assertEqual(
+            (9, 15), pieces.search(re.compile(r"^three\n", re.MULTILINE))[:2]
+        )
+        self.assertEqual((15, 20), pieces.search(re.compile(r"four\n"), 10)[:2])
+        self.assertIsNone(pieces.search(re.compile(r"zero"), 1))
+        with self.assertRaises(IndexError):
+            pieces.insert(100, "x")
+
+    def test_bytes(self):
+        pieces = ScanScanPieces(b"one\ntwo\n")
+        pieces.insert(4, b"1.5\n")
+        self.assertEqual(b"one\n1.5\ntwo\n", bytes(pieces))
+        self.assertEqual(b"", bytes(ScanScanPieces(b"")))
+
+
+if __name__ == "__main__":
+    unittest.main()
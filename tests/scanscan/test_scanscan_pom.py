@@ -0,0 +1,89 @@
+# -*- mode: python -*-
+# -*- coding: utf-8 -*-
+
+##
+# Licensed to the Apache Software Foundation (ASF) under one
+# or more contributor license agreements.  See the NOTICE file
+# distributed with this work for additional information
+# regarding copyright ownership.  The ASF licenses this file
+# to you under the Apache License, Version 2.0 (the
+# "License"); you may not use this file except in compliance
+# with the License.  You may obtain a copy of the License at
+#
+# https://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import unittest
+
+from scanscan.ScanScanPom import ScanScanPom
+
+POM = """<?xml version="1.0" encoding="UTF-8"?>
+<project>
+  <parent>
+    <groupId>org.apache.avro</groupId>
+    <artifactId>avro-parent</artifactId>
+    <version>1.11.0</version>
+  </parent>
+  <artifactId>avro</artifactId>
+  <version>1.11.0</version>
+  <!-- <dependency><groupId>com.example</groupId><artifactId>lib</artifactId>
+       <version>1.0</version></dependency> -->
+  <dependencies>
+    <dependency>
+      <groupId>com.example</groupId>
+      <artifactId>lib</artifactId>
+      <version>
+        1.0
+      </version>
+    </dependency>
+    <dependency>
+      <groupId>com.example</groupId>
+      <artifactId>other</artifactId>
+      <version>${other.version}</version>
+    </dependency>
+  </dependencies>
+  <build>
+    <plugins>
+      <plugin>
+        <artifactId>maven-jar-plugin</artifactId>
+        <version>3.2.0</version>
+      </plugin>
+    </plugins>
+  </build>
+</project>
+"""
+
+
+class ScanScanPomTestSuite(unittest.TestCase):
+    """Basic test cases."""
+
+    def test_basic(self):
+        bump = ScanScanPom.content_replace_versions(
+            {
+                "org.apache.avro:avro-parent": "1.12.0",
+                "org.apache.avro:avro": "1.12.0",
+                "com.example:lib": "2.0",
+                "com.example:other": "2.0",
+                "org.apache.maven.plugins:maven-jar-plugin": "3.3.0",
+            }
+        )
+        expected = (
+            POM.replace("1.11.0", "1.12.0")
+            .replace("        1.0\n", "        2.0\n")
+            .replace("3.2.0", "3.3.0")
+        )
+        self.assertEqual(expected, bump(POM))
+        self.assertIsNone(bump(expected))
+
+    def test_not_applied(self):
+        bump = ScanScanPom.content_replace_versions({"com.example:missing": "2.0"})
+        self.assertIsNone(bump(POM))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,98 @@
+# -*- mode: python -*-
+# -*- coding: utf-8 -*-
+
+##
+# Licensed to the Apache Software Foundation (ASF) under one
+# or more contributor license agreements.  See the NOTICE file
+# distributed with this work for additional information
+# regarding copyright ownership.  The ASF licenses this file
+# to you under the Apache License, Version 2.0 (the
+# "License"); you may not use this file except in compliance
+# with the License.  You may obtain a copy of the License at
+#
+# https://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import os
+import sys
+import tempfile
+import time
+import unittest
+from pathlib import Path
+
+from scanscan import ScanScan
+from scanscan.ScanScanPool import ScanScanPool
+
+
+@unittest.skipIf(sys.platform == "win32", "Requires fork")
+class ScanScanPoolTestSuite(unittest.TestCase):
+    """Basic test cases."""
+
+    def test_timeout(self):
+        with tempfile.TemporaryDirectory() as tmp_dir_name:
+            dtmp = Path(tmp_dir_name)
+            for i in range(10):
+                with open(dtmp / ("file%s.txt" % i), "w") as f:
+                    f.write("a" * 5 + "\n")
+            # This regex takes exponential time on a long line that doesn't match.
+            with open(dtmp / "minified.txt", "w") as f:
+                f.write("a" * 40 + "!")
+            with open(dtmp / "broken.txt", "wb") as f:
+                f.write(b"\xff\xfe\xfd")
+
+            start = time.monotonic()
+            with ScanScanPool(
+                ScanScanPool.content(
+                    ScanScan.content_replace(r"^(a+)+$", "b"), encoding="utf-8"
+                ),
+                processes=2,
+                timeout=1,
+            ) as pool:
+                results = pool.apply_recursive(tmp_dir_name)
+                # The pool can be reused after a timeout.
+                results2 = pool.map([str(dtmp / "file1.txt")])
+            self.assertLess(time.monotonic() - start, 30)
+
+            self.assertEqual([str(dtmp / "minified.txt")], pool.timed_out)
+            self.assertEqual(1, len(pool.errors))
+            self.assertEqual(str(dtmp / "broken.txt"), pool.errors[0][0])
+            self.assertIn("UnicodeDecodeError", pool.errors[0][1])
+            self.assertEqual(10, len(results))
+            self.assertTrue(all(results.values()))
+            self.assertEqual({str(dtmp / "file1.txt"): True}, results2)
+            for i in range(10):
+                with open(dtmp / ("file%s.txt" % i)) as f:
+                    self.assertEqual("b\n", f.read())
+            self.assertIn("minified.txt", os.listdir(tmp_dir_name))
+
+    def test_close_interrupted(self):
+        with tempfile.TemporaryDirectory() as tmp_dir_name:
+            dtmp = Path(tmp_dir_name)
+            with open(dtmp / "minified.txt", "w") as f:
+                f.write("a" * 40 + "!")
+
+            def paths():
+                yield str(dtmp / "minified.txt")
+                raise RuntimeError("Interrupted")
+
+            start = time.monotonic()
+            with self.assertRaises(RuntimeError):
+                with ScanScanPool(
+                    ScanScanPool.content(ScanScan.content_replace(r"^(a+)+$", "b")),
+                    processes=2,
+                    timeout=600,
+                ) as pool:
+                    pool.map(paths())
+            # The busy worker is killed instead of waiting for the regex.
+            self.assertLess(time.monotonic() - start, 30)
+            with open(dtmp / "minified.txt") as f:
+                self.assertEqual("a" * 40 + "!", f.read())
+
+
+if __name__ == "__main__":
+    unittest.main()
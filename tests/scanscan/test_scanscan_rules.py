@@ -0,0 +1,143 @@
+# -*- mode: python -*-
+# -*- coding: utf-8 -*-
+
+##
+# Licensed to the Apache Software Foundation (ASF) under one
+# or more contributor license agreements.  See the NOTICE file
+# distributed with this work for additional information
+# regarding copyright ownership.  The ASF licenses this file
+# to you under the Apache License, Version 2.0 (the
+# "License"); you may not use this file except in compliance
+# with the License.  You may obtain a copy of the License at
+#
+# https://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import json
+import os
+import tempfile
+import unittest
+from pathlib import Path
+
+from scanscan import ScanScanError
+from scanscan.ScanScanRules import ScanScanRules
+
+RULES = {
+    "rules": [
+        {
+            "name": "Update the copyright",
+            "files": {"endswith": ".txt"},
+            "replace": {"search": "Copyright 2020", "replace": "Copyright 2023"},
+        },
+        {
+            "files": {"endswith": ".txt", "exclude": "skip"},
+            "add_next": {"test": "Copyright 2023", "to_add": "Licensed"},
+        },
+        {
+            "files": {"endswith": ".py"},
+            "add_prev": {"test": "import re", "to_add": "import os"},
+        },
+    ]
+}
+
+
+class ScanScanRulesTestSuite(unittest.TestCase):
+    """Basic test cases."""
+
+    def test_from_spec(self):
+        rules = ScanScanRules.from_spec(RULES)
+        self.assertEqual(3, len(rules.rules))
+        self.assertIsNone(
+            ScanScanRules.from_spec(
+                [{"replace": {"search": "a", "replace": "b"}}]
+            ).file_filter()
+        )
+        with self.assertRaises(ScanScanError):
+            ScanScanRules.from_spec([{"unknown": {}}])
+        with self.assertRaises(ScanScanError):
+            ScanScanRules.from_spec([{"files": {"unknown": "x"}, "replace": {}}])
+        with self.assertRaises(ScanScanError):
+            ScanScanRules.from_spec([{"replace": {}, "add_next": {}}])
+
+    def test_apply_recursive(self):
+        with tempfile.TemporaryDirectory() as tmp_dir_name:
+            dtmp = Path(tmp_dir_name)
+            rules_file = str(dtmp / "rules.json")
+            with open(rules_file, "w") as f:
+                json.dump(RULES, f)
+            os.mkdir(dtmp / "src")
+            with open(dtmp / "src" / "one.txt", "w") as f:
+                f.write("Copyright 2020\nEnd\n")
+            with open(dtmp / "src" / "skip.txt", "w") as f:
+                f.write("Copyright 2020\nEnd\n")
+            with open(dtmp / "src" / "main.py", "w") as f:
+                f.write("# Main\nimport re\n")
+            with open(dtmp / "src" / "other.py", "w") as f:
+                f.write("import sys\n")
+
+            # A dry run only reports the files that would be modified.
+            rules = ScanScanRules.load(rules_file, dry_run=True)
+            expected = [
+                str(dtmp / "src" / fn) for fn in ("main.py", "one.txt", "skip.txt")
+            ]
+            self.assertEqual(expected, rules.apply_recursive(str(dtmp / "src")))
+            self.assertEqual(4, rules.stats["files"])
+            self.assertEqual(3, rules.stats["modified"])
+            with open(dtmp / "src" / "one.txt") as f:
+                self.assertEqual("Copyright 2020\nEnd\n", f.read())
+
+            rules = ScanScanRules.load(rules_file)
+            self.assertEqual(expected, rules.apply_recursive(str(dtmp / "src")))
+            with open(dtmp / "src" / "one.txt") as f:
+                self.assertEqual("Copyright 2023\nLicensed\nEnd\n", f.read())
+            with open(dtmp / "src" / "skip.txt") as f:
+                self.assertEqual("Copyright 2023\nEnd\n", f.read())
+            with open(dtmp / "src" / "main.py") as f:
+                self.assertEqual("# Main\nimport os\nimport re\n", f.read())
+
+            # Applying the rules again doesn't modify anything.
+            rules = ScanScanRules.load(rules_file)
+            self.assertEqual([], rules.apply_recursive(str(dtmp / "src"), processes=2))
+            self.assertEqual(4, rules.stats["files"])
+            self.assertEqual([], rules.stats["errors"])
+
+    def test_apply_recursive_errors(self):
+        with tempfile.TemporaryDirectory() as tmp_dir_name:
+            dtmp = Path(tmp_dir_name)
+            with open(dtmp / "latin1.txt", "wb") as f:
+                f.write(b"Copyright 2020 caf\xe9\n")
+            with open(dtmp / "one.txt", "w") as f:
+                f.write("Copyright 2020\nEnd\n")
+
+            # The same file is an error whatever the number of processes.
+            for processes in (1, 2):
+                rules = ScanScanRules.from_spec(RULES, encoding="utf-8")
+                rules.apply_recursive(tmp_dir_name, processes=processes)
+                self.assertEqual(2, rules.stats["files"])
+                self.assertEqual(
+                    [str(dtmp / "latin1.txt")], [p for p, _ in rules.stats["errors"]]
+                )
+            with open(dtmp / "one.txt") as f:
+                self.assertEqual("Copyright 2023\nLicensed\nEnd\n", f.read())
+
+    def test_apply_recursive_atomic(self):
+        with tempfile.TemporaryDirectory() as tmp_dir_name:
+            dtmp = Path(tmp_dir_name)
+            with open(dtmp / "one.txt", "w") as f:
+                f.write("Copyright 2020\nEnd\n")
+            inode = os.stat(dtmp / "one.txt").st_ino
+
+            # The workers replace the file with a new one instead of truncating it.
+            rules = ScanScanRules.from_spec(RULES)
+            rules.apply_recursive(tmp_dir_name, processes=2)
+            self.assertEqual(1, rules.stats["modified"])
+            self.assertNotEqual(inode, os.stat(dtmp / "one.txt").st_ino)
+
+
+if __name__ == "__main__":
+    unittest.main()
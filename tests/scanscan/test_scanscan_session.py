@@ -0,0 +1,118 @@
+# -*- mode: python -*-
+# -*- coding: utf-8 -*-
+
+##
+# Licensed to the Apache Software Foundation (ASF) under one
+# or more contributor license agreements.  See the NOTICE file
+# distributed with this work for additional information
+# regarding copyright ownership.  The ASF licenses this file
+# to you under the Apache License, Version 2.0 (the
+# "License"); you may not use this file except in compliance
+# with the License.  You may obtain a copy of the License at
+#
+# https://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import os
+import tempfile
+import unittest
+from pathlib import Path
+
+from scanscan import ScanScan
+from scanscan.ScanScanSession import ScanScanSession
+
+
+class ScanScanSessionTestSuite(unittest.TestCase):
+    """Basic test cases."""
+
+    def test_basic(self):
+        with tempfile.TemporaryDirectory() as tmp_dir_name:
+            dtmp = Path(tmp_dir_name)
+            for i in range(10):
+                with open(dtmp / ("file%s.txt" % i), "w") as f:
+                    f.write("version %s\n" % i)
+
+            with ScanScanSession(fsync=True) as session:
+                for i in range(10):
+                    session.open(str(dtmp / ("file%s.txt" % i))).apply(
+                        ScanScan.content_replace("version 1$", "version 100")
+                    )
+                session.open(str(dtmp / "new.txt")).content = "new\n"
+                # Nothing is written until the session is committed.
+                with open(dtmp / "file1.txt") as f:
+                    self.assertEqual("version 1\n", f.read())
+
+            with open(dtmp / "file1.txt") as f:
+                self.assertEqual("version 100\n", f.read())
+            with open(dtmp / "new.txt") as f:
+                self.assertEqual("new\n", f.read())
+            self.assertEqual(
+                sorted(["new.txt"] + ["file%s.txt" % i for i in range(10)]),
+                sorted(os.listdir(tmp_dir_name)),
+            )
+            self.assertEqual([], session.commit())
+
+    def test_links(self):
+        with tempfile.TemporaryDirectory() as tmp_dir_name:
+            dtmp = Path(tmp_dir_name)
+            with open(dtmp / "target.txt", "w") as f:
+                f.write("old\n")
+            os.symlink(dtmp / "target.txt", dtmp / "link.txt")
+
+            with ScanScanSession() as session:
+                session.open(str(dtmp / "link.txt")).content = "new\n"
+                session.open(str(dtmp / "created.txt")).content = "created\n"
+
+            # The link is kept and the file it points to is written.
+            self.assertTrue(os.path.islink(dtmp / "link.txt"))
+            with open(dtmp / "target.txt") as f:
+                self.assertEqual("new\n", f.read())
+            self.assertEqual(
+                0o666 & ~ScanScanSession.umask(),
+                os.stat(dtmp / "created.txt").st_mode & 0o777,
+            )
+
+    def test_exception(self):
+        with tempfile.TemporaryDirectory() as tmp_dir_name:
+            dtmp = Path(tmp_dir_name)
+            with open(dtmp / "file.txt", "w") as f:
+                f.write("original\n")
+
+            with self.assertRaises(ValueError):
+                with ScanScanSession() as session:
+                    session.open(str(dtmp / "file.txt")).content = "modified\n"
+                    raise ValueError("Discard the session")
+
+            with open(dtmp / "file.txt") as f:
+                self.assertEqual("original\n", f.read())
+
+    def test_rollback(self):
+        with tempfile.TemporaryDirectory() as tmp_dir_name:
+            dtmp = Path(tmp_dir_name)
+            for fn in ("a.txt", "b.txt"):
+                with open(dtmp / fn, "w") as f:
+                    f.write("original\n")
+            # A file can't be replaced by a directory, so the commit will fail.
+            os.mkdir(dtmp / "z.txt")
+
+            session = ScanScanSession()
+            for fn in ("a.txt", "b.txt", "c.txt", "z.txt"):
+                session.open(str(dtmp / fn)).content = "modified\n"
+            with self.assertRaises(OSError):
+                session.commit()
+
+            for fn in ("a.txt", "b.txt"):
+                with open(dtmp / fn) as f:
+                    self.assertEqual("original\n", f.read())
+            self.assertEqual(
+                ["a.txt", "b.txt", "z.txt"], sorted(os.listdir(tmp_dir_name))
+            )
+
+
+if __name__ == "__main__":
+    unittest.main()
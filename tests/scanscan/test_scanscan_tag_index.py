@@ -0,0 +1,88 @@
+# -*- mode: python -*-
+# -*- coding: utf-8 -*-
+
+##
+# Licensed to the Apache Software Foundation (ASF) under one
+# or more contributor license agreements.  See the NOTICE file
+# distributed with this work for additional information
+# regarding copyright ownership.  The ASF licenses this file
+# to you under the Apache License, Version 2.0 (the
+# "License"); you may not use this file except in compliance
+# with the License.  You may obtain a copy of the License at
+#
+# https://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+
+import os
+import tempfile
+import time
+import unittest
+from pathlib import Path
+
+from scanscan import ScanScan
+from scanscan.ScanScanTagIndex import ScanScanTagIndex
+
+
+class ScanScanTagIndexTestSuite(unittest.TestCase):
+    """Basic test cases."""
+
+    def test_get_version(self):
+        self.assertEqual("0.1.2.jar", ScanScan.get_version("xyz-0.1.2.jar"))
+        self.assertEqual("0.1.2-test.jar", ScanScan.get_version("xyz.0.1.2-test.jar"))
+        self.assertIsNone(ScanScan.get_version("xyz0.jar"))
+
+    def test_basic(self):
+        with tempfile.TemporaryDirectory() as tmp_dir_name:
+            dtmp = Path(tmp_dir_name)
+            os.mkdir(dtmp / "lib")
+            for fn in (
+                "avro-1.11.1.jar",
+                "avro-1.11.1-tests.jar",
+                "avro-1.10.2.jar",
+                "jackson-core-2.14.1.jar",
+                "README",
+            ):
+                (dtmp / "lib" / fn).touch()
+
+            idx = ScanScanTagIndex(tmp_dir_name)
+            self.assertTrue(idx.refresh())
+            self.assertFalse(idx.refresh())
+            self.assertTrue(idx.has_tag("README"))
+            self.assertFalse(idx.has_tag("missing"))
+            self.assertEqual(
+                [
+                    str(dtmp / "lib" / "avro-1.10.2.jar"),
+                    str(dtmp / "lib" / "avro-1.11.1.jar"),
+                ],
+                sorted(idx.files("avro", exclude="tests")),
+            )
+            self.assertEqual(
+                {
+                    "avro": [],
+                    "jackson-core": [str(dtmp / "lib" / "jackson-core-2.14.1.jar")],
+                },
+                idx.files_for_tags(["avro", "jackson-core"], include="core"),
+            )
+            self.assertIn(
+                (str(dtmp / "lib" / "avro-1.11.1-tests.jar"), "1.11.1-tests.jar"),
+                idx.tags["avro"],
+            )
+
+            # Adding a file to a directory invalidates the index.
+            time.sleep(0.01)
+            (dtmp / "lib" / "slf4j-api-2.0.6.jar").touch()
+            self.assertTrue(idx.has_tag("slf4j-api"))
+            self.assertIs(
+                ScanScanTagIndex.cached(tmp_dir_name),
+                ScanScanTagIndex.cached(tmp_dir_name),
+            )
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,102 @@
+# -*- mode: python -*-
+# -*- coding: utf-8 -*-
+
+##
+# Licensed to the Apache Software Foundation (ASF) under one
+# or more contributor license agreements.  See the NOTICE file
+# distributed with this work for additional information
+# regarding copyright ownership.  The ASF licenses this file
+# to you under the Apache License, Version 2.0 (the
+# "License"); you may not use this file except in compliance
+# with the License.  You may obtain a copy of the License at
+#
+# https://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+
+import os
+import sys
+import tempfile
+import threading
+import time
+import unittest
+from pathlib import Path
+
+from scanscan.ScanScanWatch import ScanScanWatch
+
+
+class ScanScanWatchTestSuite(unittest.TestCase):
+    """Basic test cases."""
+
+    def check_watch(self, use_inotify):
+        with tempfile.TemporaryDirectory() as tmp_dir_name:
+            dtmp = Path(tmp_dir_name)
+            with open(dtmp / "existing.txt", "w") as f:
+                f.write("existing")
+
+            # This content lambda would loop forever if it saw its own writes.
+            watch = ScanScanWatch(
+                tmp_dir_name,
+                lambda c: c + "!",
+                file_lambda=lambda dir, fn: fn.endswith(".txt"),
+                debounce=0.05,
+                poll_interval=0.05,
+                use_inotify=use_inotify,
+            )
+            thread = threading.Thread(target=watch.run)
+            thread.start()
+            try:
+                self.assertTrue(watch.ready.wait(10))
+                os.mkdir(dtmp / "sub")
+                with open(dtmp / "sub" / "new.txt", "w") as f:
+                    f.write("new")
+                with open(dtmp / "ignored.dat", "w") as f:
+                    f.write("ignored")
+
+                deadline = time.monotonic() + 10
+                while watch.applied_count == 0 and time.monotonic() < deadline:
+                    time.sleep(0.01)
+                time.sleep(0.5)
+            finally:
+                watch.stop()
+                thread.join()
+
+            self.assertEqual(1, watch.applied_count)
+            self.assertEqual(1, watch.batch_count)
+            with open(dtmp / "sub" / "new.txt") as f:
+                self.assertEqual("new!", f.read())
+            with open(dtmp / "existing.txt") as f:
+                self.assertEqual("existing", f.read())
+
+    def test_apply_batch_errors(self):
+        with tempfile.TemporaryDirectory() as tmp_dir_name:
+            dtmp = Path(tmp_dir_name)
+            with open(dtmp / "latin1.txt", "wb") as f:
+                f.write(b"caf\xe9")
+            with open(dtmp / "ok.txt", "w") as f:
+                f.write("ok")
+
+            watch = ScanScanWatch(tmp_dir_name, lambda c: c + "!", encoding="utf-8")
+            applied = watch.apply_batch(
+                {str(dtmp / "latin1.txt"), str(dtmp / "ok.txt")}
+            )
+
+            self.assertEqual([str(dtmp / "ok.txt")], applied)
+            self.assertEqual([str(dtmp / "latin1.txt")], [p for p, _ in watch.errors])
+            self.assertIn("UnicodeDecodeError", watch.errors[0][1])
+
+    def test_poll(self):
+        self.check_watch(False)
+
+    @unittest.skipUnless(sys.platform.startswith("linux"), "inotify requires linux")
+    def test_inotify(self):
+        self.check_watch(True)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,345 @@
+# -*- mode: python -*-
+# -*- coding: utf-8 -*-
+
+##
+# Licensed to the Apache Software Foundation (ASF) under one
+# or more contributor license agreements.  See the NOTICE file
+# distributed with this work for additional information
+# regarding copyright ownership.  The ASF licenses this file
+# to you under the Apache License, Version 2.0 (the
+# "License"); you may not use this file except in compliance
+# with the License.  You may obtain a copy of the License at
+#
+# https://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+
+import asyncio
+import os
+import queue
+import socket
+import sys
+import tempfile
+import threading
+import time
+import unittest
+from typing import Iterable, Optional, Set, Tuple, Union
+
+from tests.std_modules.test_module_selectors import EchoBytesSelectorServer
+from tests.std_modules.test_module_socket import (
+    EchoBytesClient,
+    EchoBytesServer,
+    EchoLoadGenerator,
+    StopwordMatcher,
+)
+
+"""
+Unit tests demonstrating asynchronous I/O.
+
+https://docs.python.org/3/library/asyncio.html
+"""
+
+if sys.version_info < (3, 8):
+    raise unittest.SkipTest("IsolatedAsyncioTestCase requires python 3.8")
+
+
+class EchoBytesProtocol(asyncio.Protocol):
+    """Returns the bytes it receives from one client of the AsyncEchoBytesServer."""
+
+    def __init__(self, server: "AsyncEchoBytesServer") -> None:
+        self.server = server
+        self.transport = None
+        self.matcher = StopwordMatcher(server.stopword)
+
+    def connection_made(self, transport: asyncio.Transport) -> None:
+        self.transport = transport
+        self.server.connected(self)
+
+    def connection_lost(self, exc: Optional[Exception]) -> None:
+        self.server.disconnected(self)
+
+    def data_received(self, data: bytes) -> None:
+        end = self.matcher.feed(data)
+        if end >= 0:
+            # Return the bytes up to the stopword and shutdown the server.
+            self.transport.write(memoryview(data)[:end])
+            self.server.stop()
+            return
+        self.transport.write(data)
+
+    def pause_writing(self) -> None:
+        # Stop receiving while the client isn't reading what was sent back.
+        self.transport.pause_reading()
+
+    def resume_writing(self) -> None:
+        self.transport.resume_reading()
+
+
+class AsyncEchoBytesServer(object):
+    """A server that returns the bytes it receives, running in an asyncio event loop.
+
+    Used as an asynchronous context manager, the server is listening when the block is
+    entered, and the exit waits until a client has sent the stopword.  If the block
+    raises an exception, the server is stopped instead.
+    """
+
+    def __init__(
+        self,
+        host: str = "",
+        port: int = 0,
+        stopword: Union[bytes, Iterable[bytes]] = b"Stop",
+        timeout: Optional[float] = None,
+    ) -> None:
+        # The number of connections the server has processed.
+        self.client_count = 0
+        self.host = host
+        self.port = port
+        # The number of seconds to wait for the stopword when exiting.
+        self.timeout = timeout
+        # When this word (or any of these words) has been received, shutdown the server.
+        self.stopword = stopword
+        self.__server = None
+        self.__stopped = None
+        self.__clients: Set[EchoBytesProtocol] = set()
+
+    async def __aenter__(self) -> "AsyncEchoBytesServer":
+        await self.start()
+        return self
+
+    async def __aexit__(self, t, v, tb) -> None:
+        if t is not None:
+            # No client is going to send the stopword after a failure.
+            self.stop()
+        try:
+            await asyncio.wait_for(self.wait_stopped(), self.timeout)
+        except asyncio.TimeoutError:
+            self.stop()
+            await self.wait_stopped()
+            raise
+
+    async def start(self) -> None:
+        """Starts listening for clients in the running event loop."""
+        loop = asyncio.get_running_loop()
+        self.__stopped = asyncio.Event()
+        # Unlike the socket module, asyncio looks up an empty host instead of using any address.
+        self.__server = await loop.create_server(
+            lambda: EchoBytesProtocol(self),
+            self.host or None,
+            self.port,
+            family=socket.AF_INET,
+        )
+        self.port = self.__server.sockets[0].getsockname()[1]
+
+    def stop(self) -> None:
+        """Stops listening and closes all of the clients that are still connected."""
+        self.__server.close()
+        for client in list(self.__clients):
+            client.transport.close()
+        self.__stopped.set()
+
+    async def wait_stopped(self) -> None:
+        """Waits until the server is stopped."""
+        await self.__stopped.wait()
+        await self.__server.wait_closed()
+
+    @staticmethod
+    def start_thread(**kwargs) -> Tuple[threading.Thread, int]:
+        """Runs a server with its own event loop in a new thread, for blocking clients.
+
+        Returns the thread, which finishes when the server is stopped, and the port.
+        """
+        ports = queue.Queue()
+
+        async def serve() -> None:
+            async with AsyncEchoBytesServer(**kwargs) as srv:
+                ports.put(srv.port)
+
+        thread = threading.Thread(target=asyncio.run, args=(serve(),))
+        thread.start()
+        return thread, ports.get(timeout=10)
+
+    def connected(self, client: EchoBytesProtocol) -> None:
+        self.client_count += 1
+        self.__clients.add(client)
+
+    def disconnected(self, client: EchoBytesProtocol) -> None:
+        self.__clients.discard(client)
+
+
+class AsyncEchoBytesClient(object):
+    """A client for speaking to the echo servers from an asyncio event loop."""
+
+    def __init__(self, host: str, port: int, timeout: Optional[float] = None) -> None:
+        self.host = host
+        self.port = port
+        self.timeout = timeout
+        self.reader = None
+        self.writer = None
+
+    async def __aenter__(self) -> "AsyncEchoBytesClient":
+        if self.writer is None:
+            self.reader, self.writer = await asyncio.wait_for(
+                asyncio.open_connection(
+                    self.host or None, self.port, family=socket.AF_INET
+                ),
+                self.timeout,
+            )
+        return self
+
+    async def __aexit__(self, t, v, tb) -> None:
+        self.writer.close()
+        await self.writer.wait_closed()
+
+    async def send(self, data: Optional[bytes]) -> bytes:
+        if data is not None:
+            self.writer.write(data)
+            await self.writer.drain()
+        return await asyncio.wait_for(self.reader.readexactly(1), self.timeout)
+
+
+class AsyncioModuleTestSuite(unittest.IsolatedAsyncioTestCase):
+    async def test_async_echo_bytes_server_basic(self) -> None:
+        """The same client/server communication as the threaded server."""
+        async with AsyncEchoBytesServer(timeout=10) as srv:
+            self.assertNotEqual(srv.port, 0)
+            self.assertEqual(0, srv.client_count)
+
+            async with AsyncEchoBytesClient("", srv.port, timeout=10) as c1:
+                self.assertEqual(bytes([1]), await c1.send(bytes([1, 2, 3])))
+                self.assertEqual(bytes([2]), await c1.send(None))
+                self.assertEqual(bytes([3]), await c1.send(None))
+
+            async with AsyncEchoBytesClient("", srv.port, timeout=10) as c2:
+                self.assertEqual(bytes([3]), await c2.send(b"\x03" + b"St"))
+                self.assertEqual(b"S", await c2.send(b"op"))
+                self.assertEqual(b"t", await c2.send(None))
+                self.assertEqual(b"o", await c2.send(None))
+                self.assertEqual(b"p", await c2.send(None))
+
+        self.assertEqual(2, srv.client_count)
+
+    async def test_async_echo_bytes_server_concurrent(self) -> None:
+        """Many clients are served at the same time by one event loop."""
+
+        async def echo(i: int) -> bytes:
+            async with AsyncEchoBytesClient("", srv.port, timeout=10) as c:
+                c.writer.write(b"%d:" % i + bytes(100))
+                return await asyncio.wait_for(
+                    c.reader.readexactly(len(b"%d:" % i) + 100), 10
+                )
+
+        async with AsyncEchoBytesServer(timeout=10) as srv:
+            echoed = await asyncio.gather(*[echo(i) for i in range(200)])
+            self.assertEqual([b"%d:" % i + bytes(100) for i in range(200)], echoed)
+            async with AsyncEchoBytesClient("", srv.port, timeout=10) as c:
+                self.assertEqual(b"S", await c.send(b"Stop"))
+
+        self.assertEqual(201, srv.client_count)
+
+    async def test_async_echo_bytes_server_exception(self) -> None:
+        """A failure in the block stops the server instead of waiting for the stopword."""
+        with self.assertRaises(ValueError):
+            async with AsyncEchoBytesServer() as srv:
+                async with AsyncEchoBytesClient("", srv.port, timeout=10) as c:
+                    self.assertEqual(b"a", await c.send(b"a"))
+                    raise ValueError("Failure")
+
+        # Without a stopword, the exit only waits until the timeout.
+        with self.assertRaises(asyncio.TimeoutError):
+            async with AsyncEchoBytesServer(timeout=0.1):
+                pass
+
+    @unittest.skipUnless(os.environ.get("BENCHMARK"), "Set BENCHMARK=1 to run")
+    async def test_benchmark_echo_bytes_servers(self) -> None:
+        """Compare the throughput of the threaded, selectors and asyncio servers."""
+
+        def throughput(port: int, size: int) -> float:
+            start = time.perf_counter()
+            with EchoBytesClient("", port, timeout=10) as c:
+                sender = threading.Thread(
+                    target=c.connection.sendall, args=(bytes(size),)
+                )
+                sender.start()
+                received = 0
+                while received < size:
+                    received += len(c.connection.recv(65536))
+                sender.join()
+            elapsed = time.perf_counter() - start
+            with EchoBytesClient("", port, timeout=10) as c:
+                c.send(b"Stop")
+            return size / elapsed / 1024
+
+        size = 1 << 26
+        with EchoBytesServer(timeout=10, buffer_size=65536) as srv:
+            print("threaded: %.0f KB/s" % throughput(srv.get_port(), size))
+        with EchoBytesSelectorServer(timeout=10) as srv:
+            print("selectors: %.0f KB/s" % throughput(srv.get_port(), size))
+        thread, port = AsyncEchoBytesServer.start_thread()
+        print("asyncio: %.0f KB/s" % throughput(port, size))
+        thread.join()
+
+    @unittest.skipUnless(os.environ.get("BENCHMARK"), "Set BENCHMARK=1 to run")
+    def test_benchmark_echo_load(self) -> None:
+        """Compare the message rate and latencies of all of the servers under load.
+
+        The load can be configured with the BENCHMARK_CONNECTIONS, BENCHMARK_PAYLOAD and
+        BENCHMARK_DURATION environment variables, and the results are written as JSON to
+        BENCHMARK_JSON if it is set.  The threaded servers can only serve one connection.
+        """
+        connections = int(os.environ.get("BENCHMARK_CONNECTIONS", 16))
+        payload_size = int(os.environ.get("BENCHMARK_PAYLOAD", 64))
+        duration = float(os.environ.get("BENCHMARK_DURATION", 2))
+
+        def load(
+            mode: str,
+            port: int,
+            connections: int,
+            path: Optional[str] = None,
+            framed: bool = False,
+        ) -> dict:
+            results = EchoLoadGenerator(
+                "", port, connections, payload_size, duration, path=path, framed=framed
+            ).run()
+            with EchoBytesClient("", port, timeout=10, path=path) as c:
+                if framed:
+                    c.send_frame(b"Stop")
+                else:
+                    c.connection.sendall(b"Stop")
+                    c.recv_exactly(4)
+            print(
+                mode
+                + ": %(connections)s connections: %(messages_per_second).0f msg/s, "
+                % results
+                + "p50 %(p50)sns, p99 %(p99)sns, p999 %(p999)sns"
+                % results["latency_ns"]
+            )
+            return results
+
+        results = {}
+        with EchoBytesServer(timeout=10) as srv:
+            results["threaded"] = load("threaded", srv.get_port(), 1)
+        with EchoBytesServer(timeout=10, buffer_size=65536) as srv:
+            results["buffered"] = load("buffered", srv.get_port(), 1)
+        with EchoBytesServer(timeout=10, framed=True) as srv:
+            results["framed"] = load("framed", srv.get_port(), 1, framed=True)
+        with tempfile.TemporaryDirectory() as tmp_dir_name:
+            path = os.path.join(tmp_dir_name, "echo.sock")
+            with EchoBytesServer(timeout=10, buffer_size=65536, path=path) as srv:
+                srv.get_address()
+                results["buffered_unix"] = load("buffered_unix", 0, 1, path)
+        with EchoBytesSelectorServer(timeout=10) as srv:
+            results["selectors"] = load("selectors", srv.get_port(), connections)
+        thread, port = AsyncEchoBytesServer.start_thread()
+        results["asyncio"] = load("asyncio", port, connections)
+        thread.join()
+        if os.environ.get("BENCHMARK_JSON"):
+            EchoLoadGenerator.write_json(os.environ["BENCHMARK_JSON"], results)
+
+
+if __name__ == "__main__":
+    unittest.main()
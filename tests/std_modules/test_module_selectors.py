@@ -0,0 +1,228 @@
+# -*- mode: python -*-
+# -*- coding: utf-8 -*-
+
+##
+# Licensed to the Apache Software Foundation (ASF) under one
+# or more contributor license agreements.  See the NOTICE file
+# distributed with this work for additional information
+# regarding copyright ownership.  The ASF licenses this file
+# to you under the Apache License, Version 2.0 (the
+# "License"); you may not use this file except in compliance
+# with the License.  You may obtain a copy of the License at
+#
+# https://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+
+import selectors
+import socket
+import unittest
+from typing import Iterable, Optional, Union
+
+from tests.std_modules.test_module_socket import (
+    EchoBytesClient,
+    EchoBytesClientPool,
+    EchoBytesServer,
+    StopwordMatcher,
+)
+
+"""
+Unit tests demonstrating high-level I/O multiplexing.
+
+https://docs.python.org/3/library/selectors.html
+"""
+
+
+class EchoConnection(object):
+    """The state of one client connected to the EchoBytesSelectorServer."""
+
+    def __init__(
+        self, connection: socket.socket, buffer_size: int, matcher: StopwordMatcher
+    ) -> None:
+        self.connection = connection
+        self.buffer = bytearray(buffer_size)
+        self.view = memoryview(self.buffer)
+        # The received bytes that haven't been sent back yet, if any.
+        self.pending = self.view[:0]
+        self.matcher = matcher
+        # Whether the stopword was received, stopping the server after the pending bytes.
+        self.stopped = False
+
+
+class EchoBytesSelectorServer(EchoBytesServer):
+    """A server that returns the bytes it receives, to many clients at once.
+
+    All of the sockets are non-blocking and served from one thread by a selector (epoll on
+    Linux).  Each client has its own buffer, and is only read again once all of its pending
+    bytes have been sent back.  When any client sends the stopword, the bytes up to the
+    stopword are returned to it and all of the connections are closed.
+    """
+
+    def __init__(
+        self,
+        host: str = "",
+        port: int = 0,
+        stopword: Union[bytes, Iterable[bytes]] = b"Stop",
+        timeout: Optional[float] = None,
+        buffer_size: int = 65536,
+        backlog: int = 1024,
+        path: Optional[str] = None,
+    ) -> None:
+        super().__init__(host, port, stopword, timeout, buffer_size, path=path)
+        # The number of connections waiting to be accepted before new clients are refused.
+        self.backlog = backlog
+
+    def run(self) -> None:
+        with selectors.DefaultSelector() as sel, self.new_socket() as s:
+            self.listen(s, self.backlog)
+            s.setblocking(False)
+            sel.register(s, selectors.EVENT_READ, None)
+
+            try:
+                shutdown_requested = False
+                while not shutdown_requested:
+                    events = sel.select(self.timeout)
+                    if not events:
+                        raise socket.timeout("No activity after %ss" % self.timeout)
+                    for key, mask in events:
+                        if key.data is None:
+                            self.accept(sel, s)
+                        elif mask & selectors.EVENT_READ:
+                            self.read(sel, key.data)
+                        else:
+                            shutdown_requested |= self.write(sel, key.data)
+            finally:
+                # Close all of the clients that are still connected.
+                for key in list(sel.get_map().values()):
+                    if key.data is not None:
+                        key.data.connection.close()
+                self.unlink()
+
+    def accept(self, sel: selectors.BaseSelector, s: socket.socket) -> None:
+        """Accepts all of the clients that are waiting to connect."""
+        while True:
+            try:
+                connection, addr = s.accept()
+            except BlockingIOError:
+                return
+            self.log.info("       accepted: %s", addr)
+            connection.setblocking(False)
+            self.client_count += 1
+            sel.register(
+                connection,
+                selectors.EVENT_READ,
+                EchoConnection(
+                    connection, self.buffer_size, StopwordMatcher(self.stopword)
+                ),
+            )
+
+    def read(self, sel: selectors.BaseSelector, client: EchoConnection) -> None:
+        """Receives bytes from a client and starts sending them back."""
+        try:
+            received = client.connection.recv_into(client.buffer)
+        except (BlockingIOError, InterruptedError):
+            return
+        except ConnectionError:
+            received = 0
+        if received == 0:
+            # The client has closed and will no longer send bytes.
+            sel.unregister(client.connection)
+            client.connection.close()
+            return
+
+        end = client.matcher.feed(client.buffer, received)
+        if end >= 0:
+            client.stopped = True
+            received = end
+        client.pending = client.view[:received]
+        # Stop reading from this client until its buffer is free again.
+        sel.modify(client.connection, selectors.EVENT_WRITE, client)
+
+    def write(self, sel: selectors.BaseSelector, client: EchoConnection) -> bool:
+        """Sends the pending bytes to a client.
+
+        Returns True if the client sent the stopword and all of the bytes up to it were sent.
+        """
+        try:
+            sent = client.connection.send(client.pending)
+        except (BlockingIOError, InterruptedError):
+            return False
+        except ConnectionError:
+            sel.unregister(client.connection)
+            client.connection.close()
+            return False
+        client.pending = client.pending[sent:]
+        self.byte_count += sent
+        if len(client.pending) > 0:
+            return False
+        if client.stopped:
+            return True
+        sel.modify(client.connection, selectors.EVENT_READ, client)
+        return False
+
+
+class SelectorsModuleTestSuite(unittest.TestCase):
+    def test_echo_bytes_selector_server_basic(self) -> None:
+        """The same client/server communication as the threaded server."""
+        with EchoBytesSelectorServer(timeout=10) as srv:
+            port = srv.get_port()
+
+            with EchoBytesClient("", port, timeout=10) as c1:
+                self.assertEqual(bytes([1]), c1.send(bytes([1, 2, 3])))
+                self.assertEqual(bytes([2]), c1.send(None))
+                self.assertEqual(bytes([3]), c1.send(None))
+
+            with EchoBytesClient("", port, timeout=10) as c2:
+                self.assertEqual(bytes([3]), c2.send(b"\x03" + b"St"))
+                self.assertEqual(b"S", c2.send(b"op"))
+                self.assertEqual(b"t", c2.send(None))
+                self.assertEqual(b"o", c2.send(None))
+                self.assertEqual(b"p", c2.send(None))
+
+            self.assertEqual(2, srv.client_count)
+
+    def test_echo_bytes_selector_server_concurrent(self) -> None:
+        """Many clients can be connected and served at the same time."""
+        clients = []
+        with EchoBytesSelectorServer(timeout=10, buffer_size=16) as srv:
+            port = srv.get_port()
+            try:
+                for i in range(200):
+                    c = EchoBytesClient("", port, timeout=10)
+                    clients.append(c.__enter__())
+                # Every client sends before any of them receive.
+                for i, c in enumerate(clients):
+                    c.connection.sendall(b"%d:" % i + bytes(100))
+                for i, c in enumerate(clients):
+                    expected = b"%d:" % i + bytes(100)
+                    received = b""
+                    while len(received) < len(expected):
+                        received += c.connection.recv(len(expected))
+                    self.assertEqual(expected, received)
+                self.assertEqual(200, srv.client_count)
+
+                # The stopword from any client stops the server.
+                self.assertEqual(b"S", clients[0].send(b"Stop"))
+            finally:
+                for c in clients:
+                    c.__exit__(None, None, None)
+            self.assertEqual(200, srv.client_count)
+
+    def test_echo_bytes_client_pool(self) -> None:
+        """A pool of clients pipelines messages over all of its connections."""
+        with EchoBytesSelectorServer(timeout=10) as srv:
+            port = srv.get_port()
+            with EchoBytesClientPool("", port, 4, timeout=10) as pool:
+                messages = [b"%d," % i for i in range(10000)]
+                self.assertEqual(messages, pool.send_many(messages))
+                self.assertEqual([b"Stop"], pool.send_many([b"Stop"]))
+            self.assertEqual(4, srv.client_count)
+
+
+if __name__ == "__main__":
+    unittest.main()
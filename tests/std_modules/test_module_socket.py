@@ -18,12 +18,25 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
+import array
+import collections
+import concurrent.futures
+import json
 import logging
+import math
+import multiprocessing
+import os
+import queue
+import random
+import select
 import socket
+import struct
+import sys
+import tempfile
 import threading
 import time
 import unittest
-from typing import Optional
+from typing import Iterable, List, Optional, Tuple, Union
 
 """Tests for sockets with Python"""
 """
@@ -32,6 +45,124 @@ Unit tests demonstrating the low-level networking interface.
 https://docs.python.org/3/library/socket.html
 """
 
+# In the framed mode, every message starts with its length as a 4 byte big-endian integer.
+FRAME_HEADER = struct.Struct(">I")
+
+
+class StopwordMatcher(object):
+    """Finds the first of one or more stopwords in a stream of bytes received in chunks.
+
+    The stopwords are compiled into an Aho-Corasick automaton, which is the generalization of
+    Knuth-Morris-Pratt to many words.  Its state is the longest end of the stream that could
+    still be the start of a stopword, so matches that span chunks are found without copying
+    any bytes.  Inside large chunks, the stopwords are searched with bytes.find instead, and
+    the automaton only runs on the first and last bytes of the chunk.
+    """
+
+    def __init__(self, stopwords: Union[bytes, Iterable[bytes]]) -> None:
+        if isinstance(stopwords, (bytes, bytearray)):
+            stopwords = [stopwords]
+        self.stopwords = [bytes(stopword) for stopword in stopwords]
+        if not self.stopwords or not all(self.stopwords):
+            raise ValueError("Stopwords must not be empty: %s" % self.stopwords)
+        # Enough bytes to hold the end of any stopword that started in the previous chunk.
+        self.overlap = max(len(stopword) for stopword in self.stopwords) - 1
+        # The stopword that was found in the last call to feed, if any.
+        self.match = None
+        self.state = 0
+        self.__compile()
+
+    def __compile(self) -> None:
+        """Builds the transitions for every state and byte, and the stopword for each state."""
+        # The trie of the stopwords, where state 0 is the root.
+        children = [{}]
+        self.matches = [None]
+        for stopword in self.stopwords:
+            state = 0
+            for byte in stopword:
+                if byte not in children[state]:
+                    children[state][byte] = len(children)
+                    children.append({})
+                    self.matches.append(None)
+                state = children[state][byte]
+            if self.matches[state] is None:
+                self.matches[state] = stopword
+
+        # Fill the transitions breadth first, so the fallback of a state is always complete.
+        self.transitions = array.array("i", bytes(4 * 256 * len(children)))
+        for byte, child in children[0].items():
+            self.transitions[byte] = child
+        fallbacks = [0] * len(children)
+        pending = collections.deque(children[0].values())
+        while pending:
+            state = pending.popleft()
+            fallback = fallbacks[state]
+            if self.matches[state] is None:
+                self.matches[state] = self.matches[fallback]
+            for byte in range(256):
+                child = children[state].get(byte)
+                if child is None:
+                    self.transitions[state * 256 + byte] = self.transitions[
+                        fallback * 256 + byte
+                    ]
+                else:
+                    self.transitions[state * 256 + byte] = child
+                    fallbacks[child] = self.transitions[fallback * 256 + byte]
+                    pending.append(child)
+
+    def reset(self) -> None:
+        """Forgets the bytes that were already fed, to start a new stream."""
+        self.state = 0
+        self.match = None
+
+    def run(self, state: int, buffer: bytes, start: int, end: int) -> Tuple[int, int]:
+        """Runs the automaton on part of the buffer.
+
+        Returns the state after the bytes, and the index just after the first stopword or -1.
+        """
+        transitions = self.transitions
+        matches = self.matches
+        for i in range(start, end):
+            state = transitions[state * 256 + buffer[i]]
+            if matches[state] is not None:
+                return state, i + 1
+        return state, -1
+
+    def contains(self, buffer: bytes, start: int, end: int) -> bool:
+        """Returns True if any stopword is in that part of the buffer, ignoring the stream."""
+        return any(
+            buffer.find(stopword, start, end) >= 0 for stopword in self.stopwords
+        )
+
+    def feed(self, buffer: bytes, size: Optional[int] = None) -> int:
+        """Consumes the first size bytes of the buffer, or all of them.
+
+        Returns the index just after the first stopword in the buffer, or -1 if there wasn't any.
+        Once a stopword is found, the matcher must be reset to be used again.
+        """
+        if size is None:
+            size = len(buffer)
+        # Any stopword that started in a previous chunk ends in the first bytes of this one.
+        head = min(size, self.overlap)
+        self.state, end = self.run(self.state, buffer, 0, head)
+        if end < 0 and size > head:
+            for stopword in self.stopwords:
+                found = buffer.find(stopword, 0, size)
+                if found >= 0 and (end < 0 or found + len(stopword) < end):
+                    end = found + len(stopword)
+            if end < 0:
+                # Only the last bytes of the chunk can be the start of a stopword.
+                self.state, _ = self.run(0, buffer, size - self.overlap, size)
+        if end >= 0:
+            self.match = self.matches[self.state] if end <= head else None
+            if self.match is None:
+                self.match = next(
+                    stopword
+                    for stopword in self.stopwords
+                    if buffer.endswith(stopword, 0, end)
+                )
+        return end
+
 
 class EchoBytesServer(object):
     """A server that returns the bytes it receives."""
@@ -40,23 +171,57 @@ class EchoBytesServer(object):
         self,
         host: str = "",
         port: int = 0,
-        stopword=b"Stop",
+        stopword: Union[bytes, Iterable[bytes]] = b"Stop",
         timeout: Optional[float] = None,
+        buffer_size: Optional[int] = None,
+        processes: Optional[int] = None,
+        path: Optional[str] = None,
+        pair: bool = False,
+        framed: bool = False,
     ) -> None:
         self.log = logging.getLogger(__name__)
         # The number of connections the server has processed.
         self.client_count = 0
+        # The number of bytes the server has sent back.
+        self.byte_count = 0
+        # In the framed mode, the number of frames the server has sent back.
+        self.frame_count = 0
         self.host = host
         self.port = port
-        # When this word has been received, shutdown the server.
+        # When this word (or any of these words) has been received, shutdown the server.
         self.stopword = stopword
         self.timeout = timeout
+        # If present, echo the bytes in chunks of up to this size instead of one by one.
+        self.buffer_size = buffer_size
+        # If present, serve the clients from this many processes listening on the same port.
+        self.processes = processes
+        # If present, listen on this AF_UNIX path instead of the host and port.  A path starting
+        # with a NUL byte is in the abstract namespace, without a file (Linux only).
+        self.path = path
+        # If true, only serve the clients created by connect_pair instead of listening.
+        self.pair = pair
+        # If true, echo whole length-prefixed frames (see FRAME_HEADER) instead of bytes.
+        self.framed = framed
+        if framed and buffer_size is None:
+            self.buffer_size = 65536
+        if processes is not None and (path is not None or pair):
+            raise ValueError("Processes are only supported for TCP sockets")
+        # Once the server is listening, the address for clients to connect to.
+        self.address = None
+        self.__listening = threading.Event()
+        self.__pairs = queue.Queue()
+        self.__worker = None
+        self.__workers = []
+        self.__started = None
+        self.__resources = None
+        self.__counters = None
         self.__exception = None
-        self.__stopword_buffer = bytes(len(self.stopword))
         self.__thread = threading.Thread(target=self.run_catch, name="EchoBytesServer")
 
     def __enter__(self) -> "EchoBytesServer":
         """Starts itself in a thread, waiting for clients to connect."""
+        if self.processes is not None:
+            self.start_processes()
         self.__thread.start()
         return self
 
@@ -70,84 +235,398 @@ class EchoBytesServer(object):
             self.run()
         except Exception as e:
             self.__exception = e
+        finally:
+            # Wake up any caller waiting for the server to listen, if it failed first.
+            self.__listening.set()
 
     def run(self) -> None:
-        with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as s:
+        if self.processes is not None:
+            self.run_processes()
+            return
+
+        if self.pair:
+            self.serve_pairs()
+            return
+
+        with self.new_socket() as s:
+            try:
+                self.listen(s)
+                self.serve(s)
+            finally:
+                self.unlink()
+
+    def new_socket(self) -> socket.socket:
+        """Creates a socket for the address family of the server."""
+        if self.path is not None:
+            return socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        return socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+
+    def listen(self, s: socket.socket, backlog: int = 0) -> None:
+        """Binds and listens to the socket."""
+        if self.path is not None:
+            self.log.info("server.bind(%r)", self.path)
+            s.bind(self.path)
+        else:
             # Bind to the specified port, or find a free port if zero.
             self.log.info("server.bind(%s:%s)", self.host, self.port)
             s.bind((self.host, self.port))
             self.port = s.getsockname()[1]
-            self.log.info("       bound: %s", s.getsockname())
+        self.log.info("       bound: %r", s.getsockname())
 
-            if self.timeout is not None:
-                s.settimeout(self.timeout)
+        if self.timeout is not None:
+            s.settimeout(self.timeout)
 
-            # Mark that the port is available for new clients to listen to.  Only one client can
-            # be connected at a time.
-            self.log.info("socket.listen()")
-            s.listen(0)
+        # Mark that the port is available for new clients to listen to.  Only one client can
+        # be connected at a time.
+        self.log.info("socket.listen(%s)", backlog)
+        s.listen(backlog)
+        if self.__worker is None:
+            self.address = (
+                self.path if self.path is not None else (self.host, self.port)
+            )
+            self.__listening.set()
+
+    def unlink(self) -> None:
+        """Removes the file created by listening on an AF_UNIX path."""
+        if self.address is not None and self.path is not None and self.path[:1] != "\0":
+            os.unlink(self.path)
+
+    def serve(self, s: socket.socket, stop_fd: Optional[int] = None) -> bool:
+        """Serves the clients connecting to the listening socket in order.
+
+        Keyword arguments:
+        s -- the listening socket.
+        stop_fd -- optional, a file descriptor that becomes readable when another process
+            received the stopword.
+
+        Returns True if this server received the stopword.
+        """
+        shutdown_requested = False
+        while not shutdown_requested:
+            if stop_fd is not None:
+                # Wait for either a client or a request from another process to stop.
+                readable, _, _ = select.select([s, stop_fd], [], [], self.timeout)
+                if stop_fd in readable:
+                    os.read(stop_fd, 1)
+                    return False
+                if not readable:
+                    raise socket.timeout("timed out")
+
+            # Create a new socket (on a different port) to talk to the client.  This
+            # is a blocking call.
+            # addr is a tuple of host, port
+            self.log.info("server.accept()")
+            connection, addr = s.accept()
+            try:
+                self.log.info("       accepted: %s", addr)
+                shutdown_requested = self.serve_connection(connection)
+            finally:
+                # The socket that we accepted should be closed down.
+                connection.close()
+                self.publish()
+        return True
+
+    def serve_connection(self, connection: socket.socket) -> bool:
+        """Echoes the bytes from one client until it disconnects.
+
+        Returns True if the stopword was received.
+        """
+        if self.timeout is not None:
+            connection.settimeout(self.timeout)
+        self.client_count += 1
+        matcher = StopwordMatcher(self.stopword)
+
+        if self.framed:
+            return self.serve_framed(connection, matcher)
+        if self.buffer_size is not None:
+            return self.serve_buffered(connection, matcher)
+
+        # Serve all the bytes in order.
+        while True:
+            # Echo all bytes
+            self.log.info("server.recv(1)")
+            data = connection.recv(1)
+            self.log.info("       received %s", data)
+            if len(data) == 0:
+                # The client has closed and will no longer send bytes.
+                return False
+            connection.sendall(data)
+            self.byte_count += len(data)
+            if matcher.feed(data) >= 0:
+                # At any zero, we'll return the byte but stop receiving.
+                return True
+
+    def serve_pairs(self) -> None:
+        """Serves the clients created by connect_pair in order, without any address."""
+        self.address = "socketpair"
+        self.__listening.set()
+        shutdown_requested = False
+        while not shutdown_requested:
+            try:
+                connection = self.__pairs.get(timeout=self.timeout)
+            except queue.Empty:
+                raise socket.timeout("timed out")
+            try:
+                shutdown_requested = self.serve_connection(connection)
+            finally:
+                connection.close()
+
+    def connect_pair(self) -> "EchoBytesClient":
+        """Returns a new client connected to this server through a socketpair.
+
+        The server must have been created with pair=True.
+        """
+        server_end, client_end = socket.socketpair()
+        self.__pairs.put(server_end)
+        client = EchoBytesClient("", 0, self.timeout)
+        client.connection = client_end
+        if self.timeout is not None:
+            client_end.settimeout(self.timeout)
+        return client
+
+    def start_processes(self) -> None:
+        """Forks the worker processes that share the same port.
+
+        Every worker listens on its own socket bound with SO_REUSEPORT, and the kernel
+        distributes the new connections between them.  The workers are forked from the thread
+        that enters the server, before the thread that collects their counters is started, since
+        forking a process with other threads running can deadlock.
+        """
+        ctx = multiprocessing.get_context("fork")
+        # The client and byte counts of each worker.
+        self.__counters = ctx.RawArray("q", 2 * self.processes)
+        # Each worker releases this once it is listening.
+        self.__started = ctx.Semaphore(0)
+        # The worker that receives the stopword writes to this pipe to stop the others.
+        stop_r, stop_w = os.pipe()
+        # Find a free port for all of the workers, and keep it while they are running.  Only
+        # listening sockets are given new connections.
+        reserved = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        self.__resources = (reserved, stop_r, stop_w)
+        self.__workers = []
+        try:
+            reserved.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEPORT, 1)
+            reserved.bind((self.host, self.port))
+            self.port = reserved.getsockname()[1]
+            for i in range(self.processes):
+                worker = ctx.Process(
+                    target=self.run_worker,
+                    args=(i, self.__started, stop_r, stop_w),
+                    name="EchoBytesServer-%s" % i,
+                )
+                worker.start()
+                self.__workers.append(worker)
+        except BaseException:
+            self.stop_processes()
+            raise
+
+    def run_processes(self) -> None:
+        """Collects the counters from the worker processes until all of them have stopped."""
+        try:
+            started = 0
+            while started < self.processes:
+                if self.__started.acquire(timeout=0.1):
+                    started += 1
+                elif any(worker.exitcode is not None for worker in self.__workers):
+                    raise ChildProcessError("A worker stopped before listening")
+            self.address = (self.host, self.port)
+            self.__listening.set()
+
+            for worker in self.__workers:
+                while worker.is_alive():
+                    worker.join(0.1)
+                    self.collect()
+        finally:
+            self.stop_processes()
+            self.collect()
+
+    def stop_processes(self) -> None:
+        """Terminates any worker that is still running and releases the shared port."""
+        for worker in self.__workers:
+            if worker.is_alive():
+                worker.terminate()
+                worker.join()
+        if self.__resources is not None:
+            reserved, stop_r, stop_w = self.__resources
+            self.__resources = None
+            reserved.close()
+            os.close(stop_r)
+            os.close(stop_w)
 
-            # But serve all clients in order.
+    def run_worker(self, index: int, listening, stop_r: int, stop_w: int) -> None:
+        """Serves clients in a worker process until any worker receives the stopword."""
+        self.__worker = index
+        self.client_count = 0
+        self.byte_count = 0
+        with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as s:
+            s.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEPORT, 1)
+            self.listen(s)
+            listening.release()
+            if self.serve(s, stop_r):
+                os.write(stop_w, bytes(self.processes - 1))
+
+    def publish(self) -> None:
+        """In a worker process, shares the counters with the parent process."""
+        if self.__worker is not None:
+            self.__counters[2 * self.__worker] = self.client_count
+            self.__counters[2 * self.__worker + 1] = self.byte_count
+
+    def collect(self) -> None:
+        """Sums the counters shared by all of the worker processes."""
+        self.client_count = sum(self.__counters[0::2])
+        self.byte_count = sum(self.__counters[1::2])
+
+    def serve_buffered(
+        self, connection: socket.socket, matcher: StopwordMatcher
+    ) -> bool:
+        """Echoes the bytes from one client in chunks until it disconnects.
+
+        The bytes are received into a preallocated buffer and sent back from a view on that
+        buffer, so nothing is copied per chunk.
+
+        Returns True if the stopword was received.
+        """
+        buffer = bytearray(self.buffer_size)
+        view = memoryview(buffer)
+        while True:
+            received = connection.recv_into(buffer)
+            if received == 0:
+                # The client has closed and will no longer send bytes.
+                return False
+            if self.log.isEnabledFor(logging.DEBUG):
+                self.log.debug("       received %s bytes", received)
+
+            end = matcher.feed(buffer, received)
+            if end >= 0:
+                # Return the bytes up to the stopword but stop receiving.
+                connection.sendall(view[:end])
+                self.byte_count += end
+                return True
+            connection.sendall(view[:received])
+            self.byte_count += received
+
+    def serve_framed(self, connection: socket.socket, matcher: StopwordMatcher) -> bool:
+        """Echoes whole frames from one client until it disconnects.
+
+        All of the complete frames in the buffer are sent back together with one vectored
+        sendmsg, directly from the buffer.  Only an incomplete frame at the end of the buffer
+        is moved to the start before receiving more.  The buffer of the connection grows to fit
+        any larger frame, and the server stops after echoing a frame that contains the stopword.
+
+        Returns True if the stopword was received.
+        """
+        buffer = bytearray(self.buffer_size)
+        view = memoryview(buffer)
+        filled = 0
+        while True:
+            received = connection.recv_into(view[filled:])
+            if received == 0:
+                # The client has closed and will no longer send bytes.
+                return False
+            filled += received
+
+            frames = []
+            start = 0
+            needed = 0
             shutdown_requested = False
-            while not shutdown_requested:
-                try:
-                    # Create a new socket (on a different port) to talk to the client.  This
-                    # is a blocking call.
-                    # addr is a tuple of host, port
-                    self.log.info("server.accept()")
-                    connection, addr = s.accept()
-                    if self.timeout is not None:
-                        connection.settimeout(self.timeout)
-                    self.log.info("       accepted: %s", addr)
-
-                    self.client_count += 1
-
-                    # Serve all the bytes in order.
-                    client_disconnected = False
-                    while not shutdown_requested and not client_disconnected:
-                        # Echo all bytes
-                        self.log.info("server.recv(1)")
-                        data = connection.recv(1)
-                        self.log.info("       received %s", data)
-                        if len(data) == 0:
-                            # The client has closed and will no longer send bytes.
-                            client_disconnected = True
-                        else:
-                            self.__stopword_buffer += data
-                            self.__stopword_buffer = self.__stopword_buffer[1:]
-                            if self.stopword == self.__stopword_buffer:
-                                # At any zero, we'll return the byte but stop receiving.
-                                shutdown_requested = True
-                        connection.sendall(data)
-
-                finally:
-                    # The socket that we accepted should be closed down.
-                    connection.close()
-
-    def get_port(self) -> int:
-        """Blocks until the port is not zero."""
-        while self.port == 0:
-            time.sleep(1)
+            while not shutdown_requested and filled - start >= FRAME_HEADER.size:
+                (length,) = FRAME_HEADER.unpack_from(buffer, start)
+                if FRAME_HEADER.size + length > len(buffer):
+                    needed = FRAME_HEADER.size + length
+                    break
+                end = start + FRAME_HEADER.size + length
+                if end > filled:
+                    break
+                payload = start + FRAME_HEADER.size
+                shutdown_requested = matcher.contains(buffer, payload, end)
+                frames.append(view[start:end])
+                start = end
+
+            if frames:
+                self.byte_count += EchoBytesServer.sendmsg_all(connection, frames)
+                self.frame_count += len(frames)
+            if shutdown_requested:
+                return True
+            # Keep the start of an incomplete frame for the next receive.
+            view[: filled - start] = view[start:filled]
+            filled -= start
+            if needed:
+                buffer = bytearray(max(needed, 2 * len(buffer)))
+                buffer[:filled] = view[:filled]
+                view = memoryview(buffer)
+
+    @staticmethod
+    def sendmsg_all(connection: socket.socket, views: List[memoryview]) -> int:
+        """Sends all of the views with as few vectored writes as possible.
+
+        Returns the number of bytes that were sent.
+        """
+        views = list(views)
+        total = 0
+        i = 0
+        while i < len(views):
+            # Only IOV_MAX buffers can be sent at once, which is 1024 on Linux.
+            stop = i + 1024
+            sent = connection.sendmsg(views[i:stop])
+            total += sent
+            # Skip everything that was sent, which can end in the middle of a view.
+            while i < len(views) and sent >= len(views[i]):
+                sent -= len(views[i])
+                i += 1
+            if sent:
+                views[i] = views[i][sent:]
+        return total
+
+    def get_port(self, timeout: Optional[float] = None) -> int:
+        """Blocks until the server is listening, returning its port."""
+        self.get_address(timeout)
         return self.port
 
+    def get_address(
+        self, timeout: Optional[float] = None
+    ) -> Union[str, Tuple[str, int]]:
+        """Blocks until the server is listening, returning the address or AF_UNIX path.
+
+        If the server failed before listening, its exception is raised instead.
+        """
+        self.__listening.wait(timeout)
+        if self.address is None:
+            if self.__exception is not None:
+                raise self.__exception
+            raise socket.timeout("Not listening after %ss" % timeout)
+        return self.address
+
 
 class EchoBytesClient(object):
     """A server for speaking to the EchoBytesServer."""
 
-    def __init__(self, host: str, port: int, timeout: Optional[float] = None) -> None:
+    def __init__(
+        self,
+        host: str,
+        port: int,
+        timeout: Optional[float] = None,
+        path: Optional[str] = None,
+    ) -> None:
         self.log = logging.getLogger(__name__)
         self.connection = None
         self.host = host
         self.port = port
         self.timeout = timeout
+        # If present, connect to this AF_UNIX path instead of the host and port.
+        self.path = path
 
     def __enter__(self) -> "EchoBytesClient":
         if self.connection is None:
-            self.connection = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+            if self.path is not None:
+                self.connection = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+                address = self.path
+            else:
+                self.connection = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+                address = (self.host, self.port)
             if self.timeout is not None:
                 self.connection.settimeout(self.timeout)
-            self.log.info("client.connect(%s:%s)", self.host, self.port)
-            self.connection.connect((self.host, self.port))
+            self.log.info("client.connect(%r)", address)
+            self.connection.connect(address)
             self.log.info("       connected: %s", self.connection.getsockname())
         return self
 
@@ -159,6 +638,301 @@ class EchoBytesClient(object):
             self.connection.sendall(data)
         return self.connection.recv(1)
 
+    def send_frame(self, payload: bytes) -> bytes:
+        """Sends one frame to a framed server and returns the payload that was echoed."""
+        return self.send_frames([payload])[0]
+
+    def send_frames(self, payloads: List[bytes]) -> List[bytes]:
+        """Sends the frames together and returns the payloads that were echoed.
+
+        The frames are not pipelined, so a batch must fit in the socket buffers.
+        """
+        views = []
+        for payload in payloads:
+            views.append(FRAME_HEADER.pack(len(payload)))
+            views.append(memoryview(payload))
+        total = EchoBytesServer.sendmsg_all(self.connection, views)
+
+        # The same frames are echoed back, so receive all of them at once.
+        buffer = bytearray(total)
+        self.recv_into_exactly(memoryview(buffer))
+        echoed = []
+        start = 0
+        while start < total:
+            (length,) = FRAME_HEADER.unpack_from(buffer, start)
+            start += FRAME_HEADER.size
+            end = start + length
+            echoed.append(bytes(buffer[start:end]))
+            start = end
+        return echoed
+
+    def recv_frame(self) -> bytes:
+        """Receives one frame, returning its payload."""
+        (length,) = FRAME_HEADER.unpack(self.recv_exactly(FRAME_HEADER.size))
+        return self.recv_exactly(length)
+
+    def recv_exactly(self, size: int) -> bytes:
+        """Receives exactly the number of bytes, in as few calls as possible."""
+        buffer = bytearray(size)
+        self.recv_into_exactly(memoryview(buffer))
+        return bytes(buffer)
+
+    def recv_into_exactly(self, view: memoryview) -> None:
+        """Fills the view with received bytes."""
+        received = 0
+        while received < len(view):
+            n = self.connection.recv_into(view[received:])
+            if n == 0:
+                raise ConnectionError(
+                    "Closed after %s of %s bytes" % (received, len(view))
+                )
+            received += n
+
+    def send_many(self, messages: List[bytes], window: int = 65536) -> List[bytes]:
+        """Sends all of the messages and returns what was echoed back for each one.
+
+        The messages are pipelined: they are sent together in batches of up to window bytes,
+        and the echo of a batch is only received after the next one is sent, so the server is
+        never idle waiting for the client.  Limiting the bytes in flight prevents both sides
+        from blocking on full socket buffers.
+        """
+        total = sum(len(message) for message in messages)
+        view = memoryview(bytearray(total))
+        batch = []
+        sent = 0
+        received = 0
+
+        def send_batch() -> None:
+            nonlocal sent, received
+            data = b"".join(batch)
+            batch.clear()
+            self.connection.sendall(data)
+            sent += len(data)
+            if sent - received > window:
+                # Receive everything up to the window that is still in flight.
+                end = sent - window
+                self.recv_into_exactly(view[received:end])
+                received = end
+
+        batch_size = 0
+        for message in messages:
+            message = memoryview(message)
+            for start in range(0, len(message), window):
+                stop = start + window
+                batch.append(message[start:stop])
+                batch_size += len(batch[-1])
+                if batch_size >= window:
+                    send_batch()
+                    batch_size = 0
+        send_batch()
+        self.recv_into_exactly(view[received:])
+
+        # Split the echoed bytes back into messages.
+        echoed = []
+        start = 0
+        for message in messages:
+            end = start + len(message)
+            echoed.append(bytes(view[start:end]))
+            start = end
+        return echoed
+
+
+class EchoBytesClientPool(object):
+    """Persistent connections to the same server, sending messages on all of them at once.
+
+    The server must be able to serve more than one client at a time.
+    """
+
+    def __init__(
+        self,
+        host: str,
+        port: int,
+        size: int,
+        timeout: Optional[float] = None,
+        path: Optional[str] = None,
+    ) -> None:
+        self.clients = [EchoBytesClient(host, port, timeout, path) for i in range(size)]
+        self.__executor = None
+
+    def __enter__(self) -> "EchoBytesClientPool":
+        for client in self.clients:
+            client.__enter__()
+        self.__executor = concurrent.futures.ThreadPoolExecutor(len(self.clients))
+        return self
+
+    def __exit__(self, t, v, tb) -> None:
+        self.__executor.shutdown()
+        for client in self.clients:
+            client.__exit__(t, v, tb)
+
+    def send_many(self, messages: List[bytes], window: int = 65536) -> List[bytes]:
+        """Sends the messages spread over all of the connections, each one pipelined.
+
+        Returns what was echoed back for each message, in the same order.
+        """
+        size = len(self.clients)
+        futures = [
+            self.__executor.submit(client.send_many, messages[i::size], window)
+            for i, client in enumerate(self.clients)
+        ]
+        echoed = [None] * len(messages)
+        for i, future in enumerate(futures):
+            echoed[i::size] = future.result()
+        return echoed
+
+
+class LatencyHistogram(object):
+    """Counts values in a fixed number of buckets, to find percentiles in constant memory.
+
+    Each power of two is split into the same number of linear buckets, so every value is
+    counted with the same relative precision (about 3% with the default 5 bits), and all the
+    values up to 2**max_bits fit in about (max_bits - bits) * 2**bits buckets.
+    """
+
+    def __init__(self, bits: int = 5, max_bits: int = 40) -> None:
+        self.bits = bits
+        self.max_bits = max_bits
+        self.counts = array.array("q", bytes(8 * self.index(1 << max_bits)))
+        self.count = 0
+        self.total = 0
+        self.max = 0
+
+    def index(self, value: int) -> int:
+        """Returns the bucket for the value."""
+        shift = value.bit_length() - self.bits - 1
+        if shift <= 0:
+            return value
+        return (shift << self.bits) + (value >> shift)
+
+    def value(self, index: int) -> int:
+        """Returns the highest value that is counted in the bucket."""
+        shift = (index >> self.bits) - 1
+        if shift <= 0:
+            return index
+        mantissa = index - (shift << self.bits)
+        return ((mantissa + 1) << shift) - 1
+
+    def record(self, value: int) -> None:
+        """Counts one value, clamped to the largest value that fits in the buckets."""
+        self.counts[min(self.index(value), len(self.counts) - 1)] += 1
+        self.count += 1
+        self.total += value
+        self.max = max(self.max, value)
+
+    def merge(self, other: "LatencyHistogram") -> None:
+        """Adds all of the values counted in another histogram with the same buckets."""
+        for i, count in enumerate(other.counts):
+            self.counts[i] += count
+        self.count += other.count
+        self.total += other.total
+        self.max = max(self.max, other.max)
+
+    def percentile(self, percent: float) -> int:
+        """Returns the value that is greater than or equal to that percent of the values."""
+        if self.count == 0:
+            return 0
+        rank = max(1, math.ceil(self.count * percent / 100))
+        seen = 0
+        for i, count in enumerate(self.counts):
+            seen += count
+            if seen >= rank and i < len(self.counts) - 1:
+                return min(self.value(i), self.max)
+        return self.max
+
+    def summary(self) -> dict:
+        return {
+            "count": self.count,
+            "mean": self.total / self.count if self.count else 0,
+            "p50": self.percentile(50),
+            "p99": self.percentile(99),
+            "p999": self.percentile(99.9),
+            "max": self.max,
+        }
+
+
+class EchoLoadGenerator(object):
+    """Sends messages from many connections to an echo server and measures each round trip.
+
+    Every connection sends one message and waits for its echo before sending the next, for
+    the duration of the run.
+    """
+
+    def __init__(
+        self,
+        host: str,
+        port: int,
+        connections: int = 1,
+        payload_size: int = 64,
+        duration: float = 1.0,
+        timeout: Optional[float] = 10,
+        path: Optional[str] = None,
+        framed: bool = False,
+    ) -> None:
+        self.host = host
+        self.port = port
+        self.connections = connections
+        self.payload_size = payload_size
+        self.duration = duration
+        self.timeout = timeout
+        self.path = path
+        # If true, send each message as one frame to a framed server.
+        self.framed = framed
+
+    def run(self) -> dict:
+        """Runs the load and returns the throughput and round trip latencies in nanoseconds."""
+        histograms = [LatencyHistogram() for i in range(self.connections)]
+        with EchoBytesClientPool(
+            self.host, self.port, self.connections, self.timeout, self.path
+        ) as pool:
+            start = time.perf_counter()
+            deadline = time.perf_counter_ns() + int(self.duration * 1e9)
+            threads = [
+                threading.Thread(target=self.load, args=(client, histogram, deadline))
+                for client, histogram in zip(pool.clients, histograms)
+            ]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+            elapsed = time.perf_counter() - start
+
+        latency = histograms[0]
+        for histogram in histograms[1:]:
+            latency.merge(histogram)
+        return {
+            "connections": self.connections,
+            "framed": self.framed,
+            "payload_size": self.payload_size,
+            "duration": elapsed,
+            "messages": latency.count,
+            "messages_per_second": latency.count / elapsed,
+            "bytes_per_second": latency.count * self.payload_size / elapsed,
+            "latency_ns": latency.summary(),
+        }
+
+    def load(
+        self, client: EchoBytesClient, histogram: LatencyHistogram, deadline: int
+    ) -> None:
+        """Sends messages on one connection until the deadline."""
+        # Avoid the stopword by only sending zeros.
+        payload = bytes(self.payload_size)
+        view = memoryview(bytearray(self.payload_size))
+        now = time.perf_counter_ns()
+        while now < deadline:
+            if self.framed:
+                client.send_frame(payload)
+            else:
+                client.connection.sendall(payload)
+                client.recv_into_exactly(view)
+            sent, now = now, time.perf_counter_ns()
+            histogram.record(now - sent)
+
+    @staticmethod
+    def write_json(filename: str, results: dict) -> None:
+        """Writes the results, to compare with previous runs."""
+        with open(filename, "w") as f:
+            json.dump(results, f, indent=2, sort_keys=True)
+
 
 class SocketModuleTestSuite(unittest.TestCase):
     def test_echo_bytes_server_basic(self) -> None:
@@ -192,6 +966,275 @@ class SocketModuleTestSuite(unittest.TestCase):
 
             self.assertEqual(3, srv.client_count)
 
+    def test_echo_bytes_server_get_port(self) -> None:
+        """Waiting for the server to listen is fast, and fails on startup errors."""
+        start = time.perf_counter()
+        with EchoBytesServer(timeout=10) as srv:
+            port = srv.get_port(timeout=10)
+            self.assertLess(time.perf_counter() - start, 1)
+            with EchoBytesClient("", port, timeout=10) as c:
+                c.connection.sendall(b"Stop")
+                self.assertEqual(b"Stop", c.recv_exactly(4))
+
+        # The port is already in use.
+        with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as s:
+            s.bind(("", 0))
+            s.listen(0)
+            with EchoBytesServer(port=s.getsockname()[1], timeout=10) as srv:
+                with self.assertRaises(OSError):
+                    srv.get_port(timeout=10)
+
+        with EchoBytesServer(timeout=10, path="/missing/echo.sock") as srv:
+            with self.assertRaises(FileNotFoundError):
+                srv.get_address(timeout=10)
+
+        # The server was never started.
+        with self.assertRaises(socket.timeout):
+            EchoBytesServer().get_port(timeout=0.01)
+
+    def test_echo_bytes_server_buffered(self) -> None:
+        """The server can echo the bytes in chunks."""
+        with EchoBytesServer(timeout=10, buffer_size=4, pair=True) as srv:
+            with srv.connect_pair() as c1:
+                c1.connection.sendall(b"0123456789")
+                self.assertEqual(b"0123456789", c1.recv_exactly(10))
+
+            # The stopword is found when it spans two chunks.
+            with srv.connect_pair() as c2:
+                c2.connection.sendall(b"xxS")
+                self.assertEqual(b"x", c2.send(None))
+                self.assertEqual(b"x", c2.send(None))
+                self.assertEqual(b"S", c2.send(None))
+                c2.connection.sendall(b"top")
+                self.assertEqual(b"top", c2.recv_exactly(3))
+
+            self.assertEqual(2, srv.client_count)
+
+    def test_echo_bytes_client_send_many(self) -> None:
+        """The client can pipeline many messages on one connection."""
+        with EchoBytesServer(timeout=10, buffer_size=4096, pair=True) as srv:
+            with srv.connect_pair() as c:
+                messages = [b"%d" % i for i in range(10000)] + [bytes(1 << 20), b"end"]
+                self.assertEqual(messages, c.send_many(messages, window=1024))
+                c.connection.sendall(b"Stop")
+                self.assertEqual(b"Stop", c.recv_exactly(4))
+        self.assertEqual(sum(len(m) for m in messages) + 4, srv.byte_count)
+
+    def test_echo_bytes_server_framed(self) -> None:
+        """The server can echo whole length-prefixed frames."""
+        with EchoBytesServer(timeout=10, buffer_size=64, framed=True, pair=True) as srv:
+            with srv.connect_pair() as c1:
+                self.assertEqual(b"Hello", c1.send_frame(b"Hello"))
+                self.assertEqual(b"", c1.send_frame(b""))
+                frames = [b"%d" % i for i in range(3000)]
+                self.assertEqual(frames, c1.send_frames(frames))
+
+                # A frame can arrive in many pieces.
+                for byte in FRAME_HEADER.pack(3) + b"abc":
+                    c1.connection.sendall(bytes([byte]))
+                self.assertEqual(b"abc", c1.recv_frame())
+
+            with srv.connect_pair() as c2:
+                # The frames up to the one containing the stopword are echoed.
+                self.assertEqual(
+                    [b"one", b"xStopx"], c2.send_frames([b"one", b"xStopx"])
+                )
+                self.assertEqual(b"", c2.connection.recv(1))
+
+        self.assertEqual(2, srv.client_count)
+        self.assertEqual(3005, srv.frame_count)
+
+        # The buffer grows for frames that don't fit, after any frames before them.
+        with EchoBytesServer(timeout=10, buffer_size=64, framed=True, pair=True) as srv:
+            with srv.connect_pair() as c:
+                frames = [b"small", bytes(61), b"x" * 1000, b"Stop"]
+                self.assertEqual(frames, c.send_frames(frames))
+        self.assertEqual(4, srv.frame_count)
+
+    def test_echo_bytes_server_unix(self) -> None:
+        """The server can listen on an AF_UNIX path."""
+        with tempfile.TemporaryDirectory() as tmp_dir_name:
+            path = os.path.join(tmp_dir_name, "echo.sock")
+            with EchoBytesServer(timeout=10, path=path) as srv:
+                self.assertEqual(path, srv.get_address())
+                self.assertTrue(os.path.exists(path))
+                with EchoBytesClient("", 0, timeout=10, path=path) as c1:
+                    self.assertEqual(bytes([1]), c1.send(bytes([1, 2])))
+                    self.assertEqual(bytes([2]), c1.send(None))
+                with EchoBytesClient("", 0, timeout=10, path=path) as c2:
+                    c2.connection.sendall(b"Stop")
+                    self.assertEqual(b"Stop", c2.recv_exactly(4))
+            self.assertEqual(2, srv.client_count)
+            self.assertFalse(os.path.exists(path))
+
+    @unittest.skipUnless(sys.platform.startswith("linux"), "Requires Linux")
+    def test_echo_bytes_server_unix_abstract(self) -> None:
+        """On Linux, an AF_UNIX address can be in the abstract namespace."""
+        path = "\0EchoBytesServer-%s" % os.getpid()
+        with EchoBytesServer(timeout=10, buffer_size=1024, path=path) as srv:
+            srv.get_address()
+            with EchoBytesClient("", 0, timeout=10, path=path) as c:
+                self.assertEqual([b"Hello", b"Stop"], c.send_many([b"Hello", b"Stop"]))
+        self.assertEqual(1, srv.client_count)
+
+    def test_echo_bytes_server_pair(self) -> None:
+        """The server can serve clients connected through a socketpair."""
+        with EchoBytesServer(timeout=10, pair=True) as srv:
+            with srv.connect_pair() as c1:
+                self.assertEqual(bytes([1]), c1.send(bytes([1, 2, 3])))
+                self.assertEqual(bytes([2]), c1.send(None))
+                self.assertEqual(bytes([3]), c1.send(None))
+            with srv.connect_pair() as c2:
+                c2.connection.sendall(b"Stop")
+                self.assertEqual(b"Stop", c2.recv_exactly(4))
+        self.assertEqual(2, srv.client_count)
+        self.assertEqual(7, srv.byte_count)
+
+    def test_stopword_matcher(self) -> None:
+        """Stopwords are found in any chunk, or across chunks."""
+        m = StopwordMatcher(b"Stop")
+        self.assertEqual(-1, m.feed(b"xxSt"))
+        self.assertEqual(-1, m.feed(b"o"))
+        self.assertEqual(1, m.feed(b"pxxStop"))
+        self.assertEqual(b"Stop", m.match)
+
+        m = StopwordMatcher([b"abab", b"bc", b"Quit"])
+        self.assertEqual(6, m.feed(b"xaababab"))
+        self.assertEqual(b"abab", m.match)
+        m.reset()
+        self.assertEqual(-1, m.feed(b"aab"))
+        self.assertEqual(1, m.feed(b"cQuit"))
+        self.assertEqual(b"bc", m.match)
+        m.reset()
+        self.assertEqual(-1, m.feed(bytearray(b"QuiQu_Qu"), 7))
+        self.assertEqual(3, m.feed(b"uit"))
+        self.assertEqual(b"Quit", m.match)
+
+        with self.assertRaises(ValueError):
+            StopwordMatcher([b"Stop", b""])
+
+    def test_stopword_matcher_random(self) -> None:
+        """The same stopwords are found as searching all of the bytes at once."""
+        rnd = random.Random(0)
+        for i in range(200):
+            stopwords = [
+                bytes(rnd.choice(b"ab") for j in range(rnd.randint(1, 5)))
+                for k in range(rnd.randint(1, 3))
+            ]
+            stream = bytes(rnd.choice(b"abc") for j in range(rnd.randint(0, 40)))
+            found = [stream.find(w) + len(w) for w in stopwords if w in stream]
+            expected = min(found) if found else -1
+
+            m = StopwordMatcher(stopwords)
+            start = 0
+            end = -1
+            while start < len(stream) and end < 0:
+                stop = start + rnd.randint(1, 8)
+                chunk = stream[start:stop]
+                end = m.feed(chunk)
+                if end >= 0:
+                    end += start
+                    self.assertTrue(stream.endswith(m.match, 0, end))
+                start += len(chunk)
+            self.assertEqual(expected, end, (stopwords, stream))
+
+    def test_latency_histogram(self) -> None:
+        """Percentiles are found within the precision of the buckets."""
+        h = LatencyHistogram()
+        for i in range(1, 100001):
+            h.record(i)
+        self.assertEqual(100000, h.count)
+        self.assertEqual(100000, h.max)
+        self.assertEqual(50000.5, h.summary()["mean"])
+        for percent, expected in ((50, 50000), (99, 99000), (99.9, 99900)):
+            self.assertAlmostEqual(
+                expected, h.percentile(percent), delta=expected * 0.04
+            )
+
+        # Small values are exact and large values fit in the last bucket.
+        h2 = LatencyHistogram()
+        for i in range(10):
+            h2.record(i)
+        h2.record(1 << 50)
+        self.assertEqual(5, h2.percentile(50))
+        self.assertEqual(9, h2.percentile(90))
+        self.assertEqual(1 << 50, h2.percentile(100))
+
+        h.merge(h2)
+        self.assertEqual(100011, h.count)
+        self.assertEqual(1 << 50, h.max)
+
+    def test_echo_load_generator(self) -> None:
+        """The load generator measures the round trips to a server."""
+        with EchoBytesServer(timeout=10, buffer_size=1024) as srv:
+            port = srv.get_port()
+            results = EchoLoadGenerator("", port, duration=0.1).run()
+            with EchoBytesClient("", port, timeout=10) as c:
+                c.send(b"Stop")
+        self.assertEqual(1, results["connections"])
+        self.assertGreater(results["messages"], 0)
+        self.assertEqual(results["messages"], results["latency_ns"]["count"])
+        self.assertLessEqual(results["latency_ns"]["p50"], results["latency_ns"]["p99"])
+        self.assertEqual(results["messages"] * 64 + 4, srv.byte_count)
+
+        with tempfile.TemporaryDirectory() as tmp_dir_name:
+            filename = os.path.join(tmp_dir_name, "results.json")
+            EchoLoadGenerator.write_json(filename, {"buffered": results})
+            with open(filename) as f:
+                self.assertEqual({"buffered": results}, json.load(f))
+
+    @unittest.skipUnless(hasattr(socket, "SO_REUSEPORT"), "Requires SO_REUSEPORT")
+    def test_echo_bytes_server_processes(self) -> None:
+        """Worker processes serve the clients on the same port."""
+        with EchoBytesServer(timeout=10, buffer_size=1024, processes=4) as srv:
+            port = srv.get_port()
+            for i in range(20):
+                with EchoBytesClient("", port, timeout=10) as c:
+                    self.assertEqual(b"%d" % (i % 10), c.send(b"%d" % (i % 10)))
+
+            # One stopword stops all of the workers.
+            with EchoBytesClient("", port, timeout=10) as c:
+                self.assertEqual(b"S", c.send(b"Stop"))
+
+        self.assertEqual(21, srv.client_count)
+        self.assertEqual(24, srv.byte_count)
+
+    @unittest.skipUnless(os.environ.get("BENCHMARK"), "Set BENCHMARK=1 to run")
+    def test_benchmark_echo_bytes_server(self) -> None:
+        """Compare the throughput of the byte by byte and buffered servers."""
+        for buffer_size, size in ((None, 1 << 16), (65536, 1 << 24)):
+            with EchoBytesServer(timeout=10, buffer_size=buffer_size) as srv:
+                port = srv.get_port()
+                start = time.perf_counter()
+                with EchoBytesClient("", port, timeout=10) as c:
+                    sender = threading.Thread(
+                        target=c.connection.sendall, args=(bytes(size),)
+                    )
+                    sender.start()
+                    received = 0
+                    while received < size:
+                        received += len(c.connection.recv(65536))
+                    sender.join()
+                elapsed = time.perf_counter() - start
+                with EchoBytesClient("", port, timeout=10) as c:
+                    c.send(srv.stopword)
+            print("buffer_size=%s: %.0f KB/s" % (buffer_size, size / elapsed / 1024))
+
+    @unittest.skipUnless(os.environ.get("BENCHMARK"), "Set BENCHMARK=1 to run")
+    def test_benchmark_echo_frames(self) -> None:
+        """Compare the message rate of single and batched frames."""
+        frames = [bytes(64)] * 1000
+        for batch in (1, 100, 1000):
+            with EchoBytesServer(timeout=10, framed=True) as srv:
+                with EchoBytesClient("", srv.get_port(), timeout=10) as c:
+                    start = time.perf_counter()
+                    for i in range(0, len(frames), batch):
+                        stop = i + batch
+                        c.send_frames(frames[i:stop])
+                    elapsed = time.perf_counter() - start
+                    c.send_frame(b"Stop")
+            print("batch=%s: %.0f frames/s" % (batch, len(frames) / elapsed))
+
     def test_accept_timeout(self) -> None:
         """A socket.accept call blocks, but can time out."""
 